@@ -1,24 +1,53 @@
 """Audit logger — SQLite-backed immutable action and escalation log."""
 
+import asyncio
 import hashlib
 import json
+import logging
 import os
 from datetime import datetime, timezone
 
 import aiosqlite
 
-from db_utils import retry_execute
+from db_utils import retry_execute, retry_executemany
+
+logger = logging.getLogger("clinibot.audit")
 
 AUDIT_DB = os.environ.get("AUDIT_DB", "/data/audit/clinic.db")
 SCHEMA_PATH = os.environ.get("SCHEMA_PATH", "/app/schema/init.sql")
 
 _db: aiosqlite.Connection | None = None
+_db_path: str | None = None
+
+# Deferred audit writes — drained in batches by a background writer task
+AUDIT_QUEUE_MAX_SIZE = int(os.environ.get("AUDIT_QUEUE_MAX_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", "100"))
+AUDIT_FLUSH_TIMEOUT_SECONDS = float(os.environ.get("AUDIT_FLUSH_TIMEOUT_SECONDS", "30"))
+
+_audit_queue: asyncio.Queue | None = None
+_writer_task: asyncio.Task | None = None
+# The writer has its own connection so rolling back a failed batch can never
+# discard another coroutine's uncommitted insert on the shared _db.
+_writer_db: aiosqlite.Connection | None = None
+
+_INSERT_ACTION_SQL = """INSERT INTO audit_log
+           (tenant_id, timestamp, session_id, user_id, channel, action,
+            tool_name, params_hash, result_summary, confirmation_id,
+            request_id, provider, model, latency_ms)
+           VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)"""
+
+_ACTION_COLUMNS = (
+    "tenant_id", "timestamp", "session_id", "user_id", "channel", "action",
+    "tool_name", "params_hash", "result_summary", "confirmation_id",
+    "request_id", "provider", "model", "latency_ms",
+)
 
 
 async def init_db(db_path: str | None = None, schema_path: str | None = None) -> None:
     """Initialize the audit database, creating tables from schema/init.sql."""
-    global _db
+    global _db, _db_path
     path = db_path or AUDIT_DB
+    _db_path = path
     schema = schema_path or SCHEMA_PATH
     _db = await aiosqlite.connect(path)
     _db.row_factory = aiosqlite.Row
@@ -40,6 +69,31 @@ def _hash_params(params: dict) -> str:
     return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
 
 
+def _action_row(
+    tenant_id: str,
+    session_id: str,
+    user_id: str,
+    channel: str,
+    action: str,
+    tool_name: str | None = None,
+    params: dict | None = None,
+    result_summary: str | None = None,
+    confirmation_id: str | None = None,
+    request_id: str | None = None,
+    provider: str | None = None,
+    model: str | None = None,
+    latency_ms: int | None = None,
+) -> tuple:
+    """Build an audit_log row, timestamped now."""
+    now = datetime.now(timezone.utc).isoformat()
+    params_hash = _hash_params(params) if params else None
+    return (
+        tenant_id, now, session_id, user_id, channel, action,
+        tool_name, params_hash, result_summary, confirmation_id,
+        request_id, provider, model, latency_ms,
+    )
+
+
 async def log_action(
     tenant_id: str,
     session_id: str,
@@ -57,24 +111,129 @@ async def log_action(
 ) -> int:
     """Insert an audit log entry. Returns the row id."""
     assert _db is not None, "audit db not initialized"
-    now = datetime.now(timezone.utc).isoformat()
-    params_hash = _hash_params(params) if params else None
-    cur = await retry_execute(
-        _db,
-        """INSERT INTO audit_log
-           (tenant_id, timestamp, session_id, user_id, channel, action,
-            tool_name, params_hash, result_summary, confirmation_id,
-            request_id, provider, model, latency_ms)
-           VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)""",
-        (
-            tenant_id, now, session_id, user_id, channel, action,
-            tool_name, params_hash, result_summary, confirmation_id,
-            request_id, provider, model, latency_ms,
-        ),
+    row = _action_row(
+        tenant_id, session_id, user_id, channel, action,
+        tool_name, params, result_summary, confirmation_id,
+        request_id, provider, model, latency_ms,
     )
+    cur = await retry_execute(_db, _INSERT_ACTION_SQL, row)
     return cur.lastrowid
 
 
+async def log_action_deferred(**kwargs) -> None:
+    """Queue an audit log entry (same arguments as log_action) for the
+    background writer. Use where the caller does not need the row id.
+
+    Falls back to a direct insert when the writer is not running or the
+    queue is full. If a batch write fails, the writer retries each row
+    individually and logs any row it still cannot persist at CRITICAL,
+    so no entry disappears silently.
+    """
+    row = _action_row(**kwargs)
+    if _audit_queue is not None and _writer_task is not None and not _writer_task.done():
+        try:
+            _audit_queue.put_nowait(row)
+            return
+        except asyncio.QueueFull:
+            logger.warning("Audit queue full, writing synchronously")
+    assert _db is not None, "audit db not initialized"
+    await retry_execute(_db, _INSERT_ACTION_SQL, row)
+
+
+async def _rollback_writer() -> None:
+    try:
+        await _writer_db.rollback()
+    except Exception as exc:
+        logger.error("Audit writer rollback failed: %s", exc)
+
+
+async def _drain_batch(first: tuple) -> None:
+    """Write `first` plus whatever else is queued, up to AUDIT_BATCH_SIZE rows."""
+    rows = [first]
+    while len(rows) < AUDIT_BATCH_SIZE:
+        try:
+            rows.append(_audit_queue.get_nowait())
+        except asyncio.QueueEmpty:
+            break
+    try:
+        await retry_executemany(_writer_db, _INSERT_ACTION_SQL, rows)
+    except Exception as exc:
+        logger.error("Audit batch write failed (%d rows), retrying per row: %s",
+                     len(rows), exc)
+        # Discard any partially applied batch so the per-row retries
+        # cannot commit duplicates alongside it.
+        await _rollback_writer()
+        for row in rows:
+            await _write_row_or_escalate(row)
+    finally:
+        for _ in rows:
+            _audit_queue.task_done()
+
+
+async def _write_row_or_escalate(row: tuple) -> None:
+    """Persist a single audit row; log it at CRITICAL if that also fails."""
+    try:
+        await retry_execute(_writer_db, _INSERT_ACTION_SQL, row)
+    except Exception as exc:
+        await _rollback_writer()
+        logger.critical(
+            "Audit row could not be persisted (%s): %s",
+            exc, dict(zip(_ACTION_COLUMNS, row)),
+        )
+
+
+async def _audit_writer() -> None:
+    while True:
+        row = await _audit_queue.get()
+        try:
+            await _drain_batch(row)
+        except Exception:
+            # Keep the writer alive; _drain_batch already accounted for the rows
+            logger.exception("Audit writer iteration failed")
+
+
+async def start_writer() -> None:
+    """Start the background audit writer (call after init_db)."""
+    global _audit_queue, _writer_task, _writer_db
+    assert _db_path is not None, "audit db not initialized"
+    _writer_db = await aiosqlite.connect(_db_path)
+    _audit_queue = asyncio.Queue(maxsize=AUDIT_QUEUE_MAX_SIZE)
+    _writer_task = asyncio.create_task(_audit_writer())
+
+
+async def stop_writer() -> None:
+    """Flush queued entries and stop the writer (call before close_db).
+
+    Waits up to AUDIT_FLUSH_TIMEOUT_SECONDS for the writer to drain the
+    queue; rows still queued after that (e.g. because the writer died) are
+    written directly.
+    """
+    global _audit_queue, _writer_task, _writer_db
+    if _writer_task is None:
+        return
+    if not _writer_task.done():
+        try:
+            await asyncio.wait_for(_audit_queue.join(), AUDIT_FLUSH_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.error("Audit writer did not flush within %.0fs", AUDIT_FLUSH_TIMEOUT_SECONDS)
+    _writer_task.cancel()
+    try:
+        await _writer_task
+    except asyncio.CancelledError:
+        pass
+    except Exception as exc:
+        logger.error("Audit writer had failed: %s", exc)
+    while not _audit_queue.empty():
+        await _write_row_or_escalate(_audit_queue.get_nowait())
+    try:
+        await _writer_db.close()
+    except Exception as exc:
+        logger.error("Closing audit writer connection failed: %s", exc)
+    _writer_task = None
+    _audit_queue = None
+    _writer_db = None
+
+
 async def log_escalation(
     tenant_id: str,
     audit_log_id: int,
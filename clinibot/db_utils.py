@@ -15,3 +15,17 @@ async def retry_execute(db, sql, params=None, retries=3, backoff=0.1):
                 await asyncio.sleep(backoff * (attempt + 1))
             else:
                 raise
+
+
+async def retry_executemany(db, sql, rows, retries=3, backoff=0.1):
+    """Executemany+commit with retry on SQLITE_BUSY."""
+    for attempt in range(retries):
+        try:
+            await db.executemany(sql, rows)
+            await db.commit()
+            return
+        except Exception as exc:
+            if "database is locked" in str(exc) and attempt < retries - 1:
+                await asyncio.sleep(backoff * (attempt + 1))
+            else:
+                raise
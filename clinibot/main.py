@@ -199,6 +199,7 @@ async def lifespan(app: FastAPI):
     load_api_keys()
     tools.init_http_client()
     await audit.init_db(AUDIT_DB, SCHEMA_PATH)
+    await audit.start_writer()
     clinical_memory.bind_db(audit._db)
     clinical_memory.load_memory_config(CONFIG_PATH)
     tools.load_tools_config(TOOLS_CONFIG)
@@ -217,6 +218,7 @@ async def lifespan(app: FastAPI):
     reminder_task.cancel()
     cleanup_task.cancel()
     await tools.close_http_client()
+    await audit.stop_writer()
     await audit.close_db()
     logger.info("Clinibot gateway stopped")
 
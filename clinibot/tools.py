@@ -1,20 +1,24 @@
 """Tool registry, MCP backend dispatch, and critical-tool confirmation gate."""
 
 import asyncio
+import functools
 import hashlib
 import hmac
 import json
 import logging
 import os
 import re
+import string
 import time
 import uuid
+from collections import defaultdict
+from types import MappingProxyType
 
-from typing import Any
+from typing import Any, Mapping
 
 import httpx
 
-from audit import log_action, log_escalation
+from audit import log_action, log_action_deferred, log_escalation
 
 logger = logging.getLogger("clinibot.tools")
 
@@ -69,7 +73,14 @@ CONFIRMATION_TTL_SECONDS = int(os.environ.get("CONFIRMATION_TTL_SECONDS", "300")
 # Tool registry — loaded from config/tools.json
 # ---------------------------------------------------------------------------
 
-_TOOLS_CONFIG: dict[str, dict] = {}
+TOOLS_CONFIG_PATH = os.environ.get("TOOLS_CONFIG", "/app/config/tools.json")
+
+_TOOLS_CONFIG: Mapping[str, dict] = MappingProxyType({})
+
+# Derived lookup tables, rebuilt together by load_tools_config()
+_CRITICAL_TOOLS: frozenset[str] = frozenset()
+_PARAM_SCHEMAS: Mapping[str, dict] = MappingProxyType({})
+_PARAM_PATTERNS: Mapping[tuple[str, str], re.Pattern] = MappingProxyType({})
 
 # ---------------------------------------------------------------------------
 # Tool domain groups — loaded from config.json
@@ -115,22 +126,45 @@ def get_tools_for_domains(domains: list[str]) -> list[str]:
     return list(result)
 
 
-def load_tools_config(path: str = "/app/config/tools.json") -> None:
-    """Load tool criticality definitions from config file."""
-    global _TOOLS_CONFIG
-    if os.path.exists(path):
-        with open(path) as f:
-            data = json.load(f)
-        _TOOLS_CONFIG = data.get("tools", {})
+def load_tools_config(path: str = TOOLS_CONFIG_PATH) -> None:
+    """Load tool criticality definitions from config file.
+
+    Builds the critical-tool set, param schemas and compiled param patterns
+    in a single pass; all are read-only afterwards.
+    """
+    global _TOOLS_CONFIG, _CRITICAL_TOOLS, _PARAM_SCHEMAS, _PARAM_PATTERNS
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        data = json.load(f)
+    tools_cfg = data.get("tools", {})
+    critical: set[str] = set()
+    schemas: dict[str, dict] = {}
+    patterns: dict[tuple[str, str], re.Pattern] = {}
+    for name, cfg in tools_cfg.items():
+        if cfg.get("critical", False):
+            critical.add(name)
+        schema = cfg.get("params")
+        if not schema:
+            continue
+        schemas[name] = schema
+        for param_name, rules in schema.items():
+            if "pattern" in rules:
+                patterns[(name, param_name)] = re.compile(rules["pattern"])
+    _TOOLS_CONFIG = MappingProxyType(tools_cfg)
+    _CRITICAL_TOOLS = frozenset(critical)
+    _PARAM_SCHEMAS = MappingProxyType(schemas)
+    _PARAM_PATTERNS = MappingProxyType(patterns)
+    _schema_to_openai_params.cache_clear()
 
 
 def is_critical(tool_name: str) -> bool:
-    return _TOOLS_CONFIG.get(tool_name, {}).get("critical", False)
+    return tool_name in _CRITICAL_TOOLS
 
 
 def validate_params(tool_name: str, params: dict[str, Any]) -> str | None:
     """Validate tool params against schema in tools.json. Returns error string or None."""
-    schema = _TOOLS_CONFIG.get(tool_name, {}).get("params")
+    schema = _PARAM_SCHEMAS.get(tool_name)
     if not schema:
         return None
     errors = []
@@ -149,7 +183,7 @@ def validate_params(tool_name: str, params: dict[str, Any]) -> str | None:
         if "enum" in rules and value not in rules["enum"]:
             errors.append(f"'{param_name}' must be one of {rules['enum']}")
         if "pattern" in rules and isinstance(value, str):
-            if not re.match(rules["pattern"], value):
+            if not _PARAM_PATTERNS[(tool_name, param_name)].match(value):
                 errors.append(f"'{param_name}' does not match pattern '{rules['pattern']}'")
     return "; ".join(errors) if errors else None
 
@@ -530,11 +564,16 @@ _HARDCODED_SCHEMAS: dict[str, dict] = {
 }
 
 
+@functools.lru_cache(maxsize=256)
 def _schema_to_openai_params(tool_name: str) -> dict:
-    """Convert tools.json params schema to OpenAI-style JSON Schema parameters."""
+    """Convert tools.json params schema to OpenAI-style JSON Schema parameters.
+
+    Memoized per tool; load_tools_config() clears the cache. Callers must
+    not mutate the returned dict.
+    """
     if tool_name in _HARDCODED_SCHEMAS:
         return _HARDCODED_SCHEMAS[tool_name]
-    schema = _TOOLS_CONFIG.get(tool_name, {}).get("params")
+    schema = _PARAM_SCHEMAS.get(tool_name)
     if not schema:
         return {"type": "object", "properties": {}}
     properties = {}
@@ -647,7 +686,7 @@ async def call_tool(
             "client_id": getattr(session, "_client_id", ""),
             "signature": sig,
         }
-        await log_action(
+        await log_action_deferred(
             tenant_id=session.tenant_id,
             session_id=session.id,
             user_id=session.user_id,
@@ -703,7 +742,7 @@ async def confirm_tool(confirmation_id: str, session: Any, client_id: str = "")
 
     _pending.pop(confirmation_id)
     result = await _dispatch(entry["tool_name"], entry["params"], session)
-    await log_action(
+    await log_action_deferred(
         tenant_id=entry["tenant_id"],
         session_id=entry["session_id"],
         user_id=entry["user_id"],
@@ -727,18 +766,72 @@ def cleanup_expired_confirmations() -> int:
     return len(expired)
 
 
+# ---------------------------------------------------------------------------
+# Short-TTL cache for idempotent (GET) backend responses
+# ---------------------------------------------------------------------------
+
+# Repeated lookups within an agent turn (retries, planning loops) are served
+# from memory. Any write (POST/PUT) to a backend drops that backend's entries
+# and bumps its generation, so a GET that was already in flight when the write
+# started cannot store its (possibly stale) response afterwards. Entries hold
+# the raw response body and are decoded on every hit, so callers never share
+# mutable state with the cache.
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "5"))
+_RESPONSE_CACHE_MAX_SIZE = 2048
+
+_response_cache: dict[tuple[str, str], tuple[float, bytes]] = {}
+_backend_generation: dict[str, int] = defaultdict(int)
+
+
+def _response_cache_key(tool_name: str, params: dict) -> tuple[str, str]:
+    return tool_name, json.dumps(params, sort_keys=True, default=str)
+
+
+def _response_cache_get(key: tuple[str, str]) -> dict | None:
+    entry = _response_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, body = entry
+    if time.monotonic() - stored_at > RESPONSE_CACHE_TTL_SECONDS:
+        _response_cache.pop(key, None)
+        return None
+    return json.loads(body)
+
+
+def _response_cache_put(key: tuple[str, str], body: bytes, base: str, generation: int) -> None:
+    """Store `body`, unless `base` has been written to since `generation` was read."""
+    if _backend_generation[base] != generation:
+        return
+    if len(_response_cache) >= _RESPONSE_CACHE_MAX_SIZE:
+        _response_cache.pop(next(iter(_response_cache)))
+    _response_cache[key] = (time.monotonic(), body)
+
+
+def _invalidate_backend_cache(base: str) -> None:
+    """Drop cached responses from every tool served by `base`."""
+    _backend_generation[base] += 1
+    stale = [k for k in _response_cache if TOOL_BACKENDS[k[0]][0] == base]
+    for k in stale:
+        _response_cache.pop(k, None)
+
+
 # ---------------------------------------------------------------------------
 # HTTP dispatch to synthetic backends
 # ---------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=128)
+def _template_fields(path_template: str) -> frozenset[str]:
+    """Placeholder names in a path template, parsed once per template."""
+    return frozenset(field for _, field, _, _ in string.Formatter().parse(path_template) if field)
+
+
 def _build_url(base: str, path_template: str, params: dict) -> tuple[str, dict]:
-    """Build URL from template, return (url, remaining_params)."""
-    used_keys = set()
-    def replacer(m):
-        key = m.group(1)
-        used_keys.add(key)
-        return str(params.get(key, ""))
-    path = re.sub(r"\{(\w+)\}", replacer, path_template)
+    """Build URL from template, return (url, remaining_params).
+
+    Missing placeholders are substituted with an empty string.
+    """
+    used_keys = _template_fields(path_template)
+    path = path_template.format_map(defaultdict(str, params))
     remaining = {k: v for k, v in params.items() if k not in used_keys}
     return f"{base}{path}", remaining
 
@@ -761,6 +854,17 @@ async def _dispatch(tool_name: str, params: dict, session: Any) -> dict:
     import metrics as _metrics
     _t0 = _time.time()
     base, method, path_template = TOOL_BACKENDS[tool_name]
+    cache_key = None
+    if method == "GET" and RESPONSE_CACHE_TTL_SECONDS > 0:
+        cache_key = _response_cache_key(tool_name, params)
+        cached = _response_cache_get(cache_key)
+        if cached is not None:
+            logger.info("[%s] dispatch %s -> cached", session.id, tool_name)
+            _metrics.TOOL_CALLS.labels(tool_name=tool_name, status="cached").inc()
+            return cached
+        generation = _backend_generation[base]
+    elif method != "GET":
+        _invalidate_backend_cache(base)
     url, remaining = _build_url(base, path_template, params)
     logger.info("[%s] dispatch %s %s", session.id, method, url)
     auth = _orthanc_auth() if base == RADIOLOGY_BASE else None
@@ -777,7 +881,10 @@ async def _dispatch(tool_name: str, params: dict, session: Any) -> dict:
         logger.info("[%s] dispatch %s -> %d", session.id, tool_name, resp.status_code)
         _metrics.TOOL_CALLS.labels(tool_name=tool_name, status="ok").inc()
         _metrics.TOOL_DURATION.labels(tool_name=tool_name).observe(_time.time() - _t0)
-        return resp.json()
+        result = resp.json()
+        if cache_key is not None and isinstance(result, dict):
+            _response_cache_put(cache_key, resp.content, base, generation)
+        return result
     except httpx.HTTPStatusError as exc:
         logger.warning("[%s] dispatch %s -> HTTP %d", session.id, tool_name, exc.response.status_code)
         _metrics.TOOL_CALLS.labels(tool_name=tool_name, status="error").inc()
@@ -789,6 +896,10 @@ async def _dispatch(tool_name: str, params: dict, session: Any) -> dict:
         _metrics.TOOL_DURATION.labels(tool_name=tool_name).observe(_time.time() - _t0)
         return {"error": f"Backend unreachable: {exc}"}
     finally:
+        if method != "GET":
+            # GETs issued while the write was in flight may have cached
+            # pre-write state; drop them now that the write has landed.
+            _invalidate_backend_cache(base)
         if not _http_client:
             await client.aclose()
 
@@ -831,3 +942,8 @@ def _summarize(result: dict) -> str:
     """Short summary of a tool result for audit logging."""
     s = json.dumps(result)
     return s[:200] if len(s) > 200 else s
+
+
+# Load tool config at import so criticality gating and validation are in
+# place even if a tool call arrives before the app lifespan runs.
+load_tools_config()
@@ -1,8 +1,9 @@
+from dataclasses import asdict, dataclass
+
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from datetime import datetime
-import uuid
 
 app = FastAPI(title="Synthetic Blood Bank", version="1.0.0")
 
@@ -21,41 +22,34 @@ blood_inventory: dict[str, int] = {
     "O-": 6,
 }
 
-crossmatch_requests: dict[str, dict] = {
-    "XM-001": {
-        "request_id": "XM-001",
-        "patient_id": "PAT-1001",
-        "blood_type": "A+",
-        "units": 2,
-        "priority": "routine",
-        "status": "pending",
-        "created_at": "2026-02-27T08:00:00Z",
-    },
-    "XM-002": {
-        "request_id": "XM-002",
-        "patient_id": "PAT-1002",
-        "blood_type": "O-",
-        "units": 1,
-        "priority": "urgent",
-        "status": "completed",
-        "created_at": "2026-02-27T07:30:00Z",
-    },
-    "XM-003": {
-        "request_id": "XM-003",
-        "patient_id": "PAT-1003",
-        "blood_type": "B+",
-        "units": 3,
-        "priority": "stat",
-        "status": "in_progress",
-        "created_at": "2026-02-27T09:15:00Z",
-    },
+@dataclass(slots=True)
+class CrossmatchRecord:
+    """Stored crossmatch request."""
+
+    request_id: str
+    patient_id: str
+    blood_type: str
+    units: int
+    priority: str
+    status: str
+    created_at: str
+
+
+crossmatch_requests: dict[str, CrossmatchRecord] = {
+    "XM-001": CrossmatchRecord("XM-001", "PAT-1001", "A+", 2, "routine", "pending", "2026-02-27T08:00:00Z"),
+    "XM-002": CrossmatchRecord("XM-002", "PAT-1002", "O-", 1, "urgent", "completed", "2026-02-27T07:30:00Z"),
+    "XM-003": CrossmatchRecord("XM-003", "PAT-1003", "B+", 3, "stat", "in_progress", "2026-02-27T09:15:00Z"),
 }
 
+_xm_counter = len(crossmatch_requests)
+
 # ---------------------------------------------------------------------------
 # Request / response models
 # ---------------------------------------------------------------------------
 
 class CrossmatchCreate(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True)
+
     patient_id: str
     blood_type: str
     units: int
@@ -79,20 +73,22 @@ def availability():
 def get_crossmatch(request_id: str):
     if request_id not in crossmatch_requests:
         raise HTTPException(status_code=404, detail="Crossmatch request not found")
-    return crossmatch_requests[request_id]
+    return asdict(crossmatch_requests[request_id])
 
 
 @app.post("/crossmatch", status_code=201)
 def create_crossmatch(body: CrossmatchCreate):
-    request_id = f"XM-{uuid.uuid4().hex[:6].upper()}"
-    record = {
-        "request_id": request_id,
-        "patient_id": body.patient_id,
-        "blood_type": body.blood_type,
-        "units": body.units,
-        "priority": body.priority,
-        "status": "pending",
-        "created_at": datetime.utcnow().isoformat() + "Z",
-    }
+    global _xm_counter
+    _xm_counter += 1
+    request_id = f"XM-{_xm_counter:03d}"
+    record = CrossmatchRecord(
+        request_id=request_id,
+        patient_id=body.patient_id,
+        blood_type=body.blood_type,
+        units=body.units,
+        priority=body.priority,
+        status="pending",
+        created_at=datetime.utcnow().isoformat() + "Z",
+    )
     crossmatch_requests[request_id] = record
-    return record
+    return asdict(record)
@@ -1,9 +1,11 @@
+from collections import deque
+from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional
 
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 app = FastAPI(title="Synthetic ERP", description="Hospital supply and equipment management")
 
@@ -18,6 +20,8 @@ class Priority(str, Enum):
 
 
 class SupplyOrderRequest(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True)
+
     item_id: str
     quantity: int
     department: str
@@ -35,6 +39,20 @@ class SupplyOrderResponse(BaseModel):
     created_at: str
 
 
+@dataclass(slots=True)
+class OrderRecord:
+    """Stored supply order."""
+
+    order_id: str
+    item_id: str
+    item_name: str
+    quantity: int
+    department: str
+    priority: str
+    status: str
+    created_at: str
+
+
 # --- Seed Data ---
 
 supplies = {
@@ -53,10 +71,22 @@ equipment = {
     "EQP-004": {"equipment_id": "EQP-004", "name": "Patient Monitor", "total": 4, "available": 3, "in_use": 1, "maintenance": 0},
 }
 
-orders: list[dict] = []
+# Bounded order log (oldest evicted first) with an id index kept in step
+ORDERS_MAX_SIZE = 10_000
+orders: deque[OrderRecord] = deque(maxlen=ORDERS_MAX_SIZE)
+_orders_by_id: dict[str, OrderRecord] = {}
 order_counter = 0
 
 
+def _try_decrement(item: dict, quantity: int) -> bool:
+    """Take `quantity` from item stock if enough is available. Returns success."""
+    remaining = item["stock"] - quantity
+    if remaining < 0:
+        return False
+    item["stock"] = remaining
+    return True
+
+
 # --- Endpoints ---
 
 @app.get("/health")
@@ -81,8 +111,10 @@ def get_equipment(equipment_id: str):
     return {**item, "status": status}
 
 
+# async so the stock check/decrement and counter bump run on the event loop
+# without interleaving, rather than concurrently in the sync threadpool.
 @app.post("/supply-order", response_model=SupplyOrderResponse)
-def place_supply_order(order: SupplyOrderRequest):
+async def place_supply_order(order: SupplyOrderRequest):
     global order_counter
 
     item = supplies.get(order.item_id)
@@ -92,25 +124,27 @@ def place_supply_order(order: SupplyOrderRequest):
     if order.quantity <= 0:
         raise HTTPException(status_code=400, detail="Quantity must be positive")
 
-    if order.quantity > item["stock"]:
+    if not _try_decrement(item, order.quantity):
         raise HTTPException(
             status_code=400,
             detail=f"Insufficient stock. Available: {item['stock']} {item['unit']}",
         )
 
-    item["stock"] -= order.quantity
     order_counter += 1
     order_id = f"ORD-{order_counter:04d}"
 
-    record = {
-        "order_id": order_id,
-        "item_id": order.item_id,
-        "item_name": item["name"],
-        "quantity": order.quantity,
-        "department": order.department,
-        "priority": order.priority.value,
-        "status": "confirmed",
-        "created_at": datetime.now(timezone.utc).isoformat(),
-    }
+    record = OrderRecord(
+        order_id=order_id,
+        item_id=order.item_id,
+        item_name=item["name"],
+        quantity=order.quantity,
+        department=order.department,
+        priority=order.priority.value,
+        status="confirmed",
+        created_at=datetime.now(timezone.utc).isoformat(),
+    )
+    if len(orders) == orders.maxlen:
+        _orders_by_id.pop(orders[0].order_id, None)
     orders.append(record)
-    return record
+    _orders_by_id[order_id] = record
+    return asdict(record)
@@ -3,7 +3,7 @@ from typing import Optional
 from uuid import uuid4
 
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 app = FastAPI(title="Synthetic LIS", version="0.1.0")
 
@@ -108,6 +108,8 @@ _order_counter = len(_seed)
 
 
 class LabOrderRequest(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True)
+
     patient_id: str
     test_type: str
     priority: Optional[str] = "routine"
@@ -1,13 +1,22 @@
+import functools
+import os
 import random
-from contextlib import asynccontextmanager
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import asynccontextmanager, contextmanager
+from itertools import takewhile
 from datetime import datetime, timedelta, timezone
 
 import h5py
 import numpy as np
+import orjson
 from scipy.stats import linregress
 from fastapi import FastAPI, HTTPException, Query, Body
+from fastapi.responses import JSONResponse, Response
 
-from hdf5_generator import DATA_DIR, ECG_LEADS, generate_all
+from hdf5_generator import DATA_DIR, ECG_LEADS, INTEGER_VITALS, generate_all
 
 # ---------------------------------------------------------------------------
 # Seed data
@@ -193,64 +202,61 @@ for doc, pids in DOCTOR_MAP.items():
 # NEWS2 (simplified) scoring
 # ---------------------------------------------------------------------------
 
-def _news_hr(hr: int) -> int:
-    if hr <= 40:
-        return 3
-    if hr <= 50:
-        return 2
-    if hr <= 60:
-        return 1
-    if hr <= 90:
-        return 0
-    if hr <= 110:
-        return 1
-    if hr <= 130:
-        return 2
-    return 3
-
-
-def _news_spo2(spo2: int) -> int:
-    if spo2 <= 91:
-        return 3
-    if spo2 <= 93:
-        return 2
-    if spo2 <= 95:
-        return 1
-    return 0
-
-
-def _news_systolic(sys: int) -> int:
-    if sys <= 90:
-        return 3
-    if sys <= 100:
-        return 2
-    if sys <= 110:
-        return 1
-    if sys <= 219:
-        return 0
-    return 3
-
-
-def _news_temp(temp: float) -> int:
-    if temp <= 35.0:
-        return 3
-    if temp <= 36.0:
-        return 1
-    if temp <= 38.0:
-        return 0
-    if temp <= 39.0:
-        return 1
-    return 2
+# Band upper bounds (inclusive) and the score for each band; a value above
+# the last bound takes the final score.
+_HR_BOUNDS = (40, 50, 60, 90, 110, 130)
+_HR_SCORES = (3, 2, 1, 0, 1, 2, 3)
+_SPO2_BOUNDS = (91, 93, 95)
+_SPO2_SCORES = (3, 2, 1, 0)
+_SYSTOLIC_BOUNDS = (90, 100, 110, 219)
+_SYSTOLIC_SCORES = (3, 2, 1, 0, 3)
+_TEMP_BOUNDS = (35.0, 36.0, 38.0, 39.0)
+_TEMP_SCORES = (3, 1, 0, 1, 2)
+
+# (vitals key, default, bounds, scores)
+_NEWS_PARAMS = (
+    ("heart_rate", 75, _HR_BOUNDS, _HR_SCORES),
+    ("spo2", 98, _SPO2_BOUNDS, _SPO2_SCORES),
+    ("bp_systolic", 120, _SYSTOLIC_BOUNDS, _SYSTOLIC_SCORES),
+    ("temperature", 37.0, _TEMP_BOUNDS, _TEMP_SCORES),
+)
 
 
 def compute_news(vitals: dict) -> int:
     """Compute simplified NEWS2 score from a vitals dict."""
-    score = 0
-    score += _news_hr(vitals.get("heart_rate", 75))
-    score += _news_spo2(vitals.get("spo2", 98))
-    score += _news_systolic(vitals.get("bp_systolic", 120))
-    score += _news_temp(vitals.get("temperature", 37.0))
-    return score
+    return sum(
+        scores[bisect_left(bounds, vitals.get(key, default))]
+        for key, default, bounds, scores in _NEWS_PARAMS
+    )
+
+
+# Packed tables for the batch path: each parameter's bounds are shifted into
+# its own disjoint range so one searchsorted call bands all four columns.
+_NEWS_KEYS = tuple((key, default) for key, default, _, _ in _NEWS_PARAMS)
+_NEWS_OFFSETS = 1e4 * np.arange(len(_NEWS_PARAMS))
+_NEWS_PACKED_BOUNDS = np.concatenate([
+    np.asarray(bounds, dtype=np.float64) + offset
+    for (_, _, bounds, _), offset in zip(_NEWS_PARAMS, _NEWS_OFFSETS)
+])
+_NEWS_PACKED_SCORES = np.concatenate([scores for _, _, _, scores in _NEWS_PARAMS]).astype(np.int64)
+# Per column: subtract the bounds start, add the scores start
+_NEWS_INDEX_SHIFT = (
+    np.cumsum([0] + [len(scores) for _, _, _, scores in _NEWS_PARAMS[:-1]])
+    - np.cumsum([0] + [len(bounds) for _, _, bounds, _ in _NEWS_PARAMS[:-1]])
+)
+
+
+def compute_news_batch(readings: list[dict]) -> np.ndarray:
+    """Compute simplified NEWS2 scores for many vitals dicts in one NumPy pass."""
+    n, k = len(readings), len(_NEWS_KEYS)
+    values = np.fromiter(
+        (r.get(key, default) for r in readings for key, default in _NEWS_KEYS),
+        dtype=np.float64,
+        count=n * k,
+    ).reshape(n, k)
+    values += _NEWS_OFFSETS
+    idx = np.searchsorted(_NEWS_PACKED_BOUNDS, values, side="left") + _NEWS_INDEX_SHIFT
+    return _NEWS_PACKED_SCORES[idx].sum(axis=1)
 
 
 # ---------------------------------------------------------------------------
@@ -269,9 +275,25 @@ async def lifespan(app: FastAPI):
     global EVENT_INDEX
     EVENT_INDEX = generate_all(PATIENT_IDS)
     yield
+    _close_h5_handles()
+    _ecg_payload_bytes.cache_clear()
 
 
-app = FastAPI(title="Synthetic Monitoring Service", lifespan=lifespan)
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered by orjson; numpy arrays serialize natively.
+
+    Local replacement for FastAPI's deprecated ``ORJSONResponse``.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+app = FastAPI(
+    title="Synthetic Monitoring Service",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # ---------------------------------------------------------------------------
 # Existing endpoints
@@ -317,14 +339,12 @@ def analyze_trend(readings: list[dict], hours: int = 24) -> dict:
         return {"error": f"Need at least 2 readings in the last {hours}h, got {len(filtered)}"}
 
     # Compute EWS per reading
+    ews_scores = compute_news_batch(filtered).tolist()
     scored_readings = []
-    ews_scores = []
-    for r in filtered:
-        ews = compute_news(r)
+    for r, ews in zip(filtered, ews_scores):
         entry = {k: v for k, v in r.items() if k != "_ts"}
         entry["ews_score"] = ews
         scored_readings.append(entry)
-        ews_scores.append(ews)
 
     # Hours elapsed from first reading for regression x-axis
     t0 = filtered[0]["_ts"]
@@ -401,7 +421,7 @@ def list_doctors():
     ]
 
 
-def _patient_summary(patient_id: str) -> dict:
+def _build_summary(patient_id: str) -> dict:
     """Build a patient summary with latest vitals and NEWS score."""
     history = VITALS_DB.get(patient_id)
     if not history:
@@ -417,6 +437,18 @@ def _patient_summary(patient_id: str) -> dict:
     }
 
 
+# Latest summary per patient; VITALS_DB is fixed at startup, so these never go stale
+LATEST_SUMMARY: dict[str, dict] = {pid: _build_summary(pid) for pid in VITALS_DB}
+
+
+def _patient_summary(patient_id: str) -> dict:
+    """Cached patient summary. Treat as read-only; copy before modifying."""
+    summary = LATEST_SUMMARY.get(patient_id)
+    if summary is None:
+        return _build_summary(patient_id)
+    return summary
+
+
 @app.get("/ward/{ward_id}/patients")
 def get_ward_patients(ward_id: str):
     pids = WARD_MAP.get(ward_id)
@@ -488,7 +520,7 @@ def get_ward_rounds(ward_id: str):
     cutoff_4h = now - timedelta(hours=4)
     patients = []
     for pid in pids:
-        summary = _patient_summary(pid)
+        summary = dict(_patient_summary(pid))
         history = VITALS_DB.get(pid, [])
         vitals_4h = []
         for r in history:
@@ -512,71 +544,114 @@ def get_patient_events(patient_id: str, hours: int = Query(default=24, ge=1, le=
     events = EVENT_INDEX.get(patient_id)
     if events is None:
         raise HTTPException(status_code=404, detail=f"Patient {patient_id} not found")
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
-    filtered = [
-        e for e in events
-        if datetime.fromisoformat(e["timestamp"]) >= cutoff
-    ]
+    cutoff_ts = (datetime.now(timezone.utc) - timedelta(hours=hours)).timestamp()
+    # Index is sorted most recent first, so stop at the first older event
+    filtered = list(takewhile(lambda e: e["ts_epoch"] >= cutoff_ts, events))
     return {"patient_id": patient_id, "hours": hours, "events": filtered}
 
 
+_HDF5_PATH_TEMPLATE = os.path.join(DATA_DIR, "{}_2026-02.h5")
+
+
 def _hdf5_path(patient_id: str) -> str:
-    import os
-    return os.path.join(DATA_DIR, f"{patient_id}_2026-02.h5")
+    return _HDF5_PATH_TEMPLATE.format(patient_id)
+
+
+# Files are read-only once generated, so handles stay open between requests
+# and the superblock/B-tree metadata is parsed once per file, not per call.
+# Handles are reference-counted: one evicted while a request is still reading
+# from it is closed by that request's release, not at eviction.
+_H5_HANDLE_CACHE_SIZE = 64
+_h5_handles: OrderedDict[str, h5py.File] = OrderedDict()
+_h5_users: dict[int, int] = {}  # id(handle) -> requests currently reading it
+_h5_handles_lock = threading.Lock()
+
+
+@contextmanager
+def _open_h5(patient_id: str) -> Iterator[h5py.File]:
+    """Borrow a cached read-only handle for a patient's HDF5 file."""
+    with _h5_handles_lock:
+        f = _h5_handles.get(patient_id)
+        if f is not None:
+            _h5_handles.move_to_end(patient_id)
+        else:
+            try:
+                f = h5py.File(_hdf5_path(patient_id), "r")
+            except FileNotFoundError:
+                raise HTTPException(status_code=404, detail=f"HDF5 file not found for {patient_id}")
+            _h5_handles[patient_id] = f
+            if len(_h5_handles) > _H5_HANDLE_CACHE_SIZE:
+                _, evicted = _h5_handles.popitem(last=False)
+                if id(evicted) not in _h5_users:
+                    evicted.close()
+        _h5_users[id(f)] = _h5_users.get(id(f), 0) + 1
+    try:
+        yield f
+    finally:
+        with _h5_handles_lock:
+            remaining = _h5_users.pop(id(f)) - 1
+            if remaining:
+                _h5_users[id(f)] = remaining
+            elif _h5_handles.get(patient_id) is not f:
+                f.close()
+
+
+def _close_h5_handles() -> None:
+    with _h5_handles_lock:
+        while _h5_handles:
+            _, f = _h5_handles.popitem()
+            f.close()
 
 
 def _read_event_vitals(patient_id: str, event_id: str) -> dict:
     """Read vitals from an HDF5 event group."""
-    path = _hdf5_path(patient_id)
-    try:
-        with h5py.File(path, "r") as f:
-            if event_id not in f:
-                raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
-            eg = f[event_id]
-            vitals = {}
-            vg = eg["vitals"]
-            for vname in vg:
-                ds = vg[vname]
-                vitals[vname] = {
-                    "value": ds.attrs["value"],
-                    "units": ds.attrs["units"],
-                    "timestamp": ds.attrs["timestamp"],
-                }
-            result = {
-                "patient_id": patient_id,
-                "event_id": event_id,
-                "condition": eg.attrs["condition"],
-                "timestamp": eg.attrs["event_timestamp"],
-                "vitals": vitals,
+    with _open_h5(patient_id) as f:
+        if event_id not in f:
+            raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
+        eg = f[event_id]
+        vitals = {}
+        for r in eg["vitals"][:]:
+            name = r["name"].decode()
+            value = r["value"].item()
+            vitals[name] = {
+                "value": int(value) if name in INTEGER_VITALS else value,
+                "units": r["units"].decode(),
+                "timestamp": r["timestamp"].decode(),
             }
-            return result
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail=f"HDF5 file not found for {patient_id}")
+        vitals["xl_posture"] = {
+            "value": eg["posture"][()].decode(),
+            "units": "",
+            "timestamp": eg.attrs["event_timestamp"],
+        }
+        result = {
+            "patient_id": patient_id,
+            "event_id": event_id,
+            "condition": eg.attrs["condition"],
+            "timestamp": eg.attrs["event_timestamp"],
+            "vitals": vitals,
+        }
+    return result
 
 
 def _read_event_ecg(patient_id: str, event_id: str) -> dict:
     """Read 7-lead ECG arrays from an HDF5 event group."""
-    path = _hdf5_path(patient_id)
-    try:
-        with h5py.File(path, "r") as f:
-            if event_id not in f:
-                raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
-            eg = f[event_id]
-            ecg_g = eg["ecg"]
-            leads = {}
-            for lead in ECG_LEADS:
-                leads[lead] = ecg_g[lead][:].tolist()
-            return {
-                "patient_id": patient_id,
-                "event_id": event_id,
-                "condition": eg.attrs["condition"],
-                "sampling_rate_hz": 200,
-                "duration_s": 12,
-                "samples_per_lead": 2400,
-                "leads": leads,
-            }
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail=f"HDF5 file not found for {patient_id}")
+    with _open_h5(patient_id) as f:
+        if event_id not in f:
+            raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
+        eg = f[event_id]
+        arr = eg["ecg/leads"][:]
+        condition = eg.attrs["condition"]
+    # Rows stay numpy arrays; ORJSONResponse writes them without boxing floats
+    leads = {lead: arr[i] for i, lead in enumerate(ECG_LEADS)}
+    return {
+        "patient_id": patient_id,
+        "event_id": event_id,
+        "condition": condition,
+        "sampling_rate_hz": 200,
+        "duration_s": 12,
+        "samples_per_lead": 2400,
+        "leads": leads,
+    }
 
 
 @app.get("/ecg/{patient_id}/latest")
@@ -595,7 +670,7 @@ def get_latest_ecg(patient_id: str, duration: int = Query(default=10, ge=1, le=3
     latest = sorted_events[0]
     result = _read_event_ecg(patient_id, latest["event_id"])
     result["requested_duration_s"] = duration
-    return result
+    return ORJSONResponse(result)
 
 
 @app.get("/events/{patient_id}/{event_id}/vitals")
@@ -603,9 +678,15 @@ def get_event_vitals(patient_id: str, event_id: str):
     return _read_event_vitals(patient_id, event_id)
 
 
+@functools.lru_cache(maxsize=256)
+def _ecg_payload_bytes(patient_id: str, event_id: str) -> bytes:
+    """Serialized ECG response; safe to cache as files never change after startup."""
+    return orjson.dumps(_read_event_ecg(patient_id, event_id), option=orjson.OPT_SERIALIZE_NUMPY)
+
+
 @app.get("/events/{patient_id}/{event_id}/ecg")
 def get_event_ecg(patient_id: str, event_id: str):
-    return _read_event_ecg(patient_id, event_id)
+    return Response(_ecg_payload_bytes(patient_id, event_id), media_type="application/json")
 
 
 # ---------------------------------------------------------------------------
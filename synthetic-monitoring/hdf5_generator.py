@@ -1,8 +1,9 @@
 """Generate synthetic HDF5 waveform/event files per patient."""
 
 import os
-import random
 import uuid
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 import h5py
@@ -25,6 +26,8 @@ RESP_SAMPLES = RESP_HZ * RESP_DURATION_S       # ~396
 
 ECG_LEADS = ["ECG1", "ECG2", "ECG3", "aVR", "aVL", "aVF", "vVX"]
 
+POSTURES = ["Supine", "Left", "Right", "Prone"]
+
 CONDITIONS = ["N", "ST", "SB", "VT", "AFIB"]
 CONDITION_WEIGHTS = [0.40, 0.20, 0.15, 0.15, 0.10]
 
@@ -39,101 +42,176 @@ CONDITION_HR = {
 
 EVENTS_PER_PATIENT = (8, 12)
 
+# CONDITION_HR bounds as arrays aligned with CONDITIONS, for vectorized draws
+_CONDITION_HR_LO = np.array([CONDITION_HR[c][0] for c in CONDITIONS])
+_CONDITION_HR_HI = np.array([CONDITION_HR[c][1] for c in CONDITIONS])
+
+# Optional waveform compression: "gzip", "lzf" or "" (off). Off by default
+# for write and read speed: the signals carry additive noise, so the filters
+# only save ~15-20% of space while reads get 2-3x slower.
+WAVEFORM_COMPRESSION = os.environ.get("HDF5_COMPRESSION", "")
+
+# One row per event in the file-level /events_index dataset
+EVENTS_INDEX_DTYPE = np.dtype([
+    ("event_id", "S16"),
+    ("uuid", "S36"),
+    ("timestamp_epoch", "f8"),
+    ("condition", "S8"),
+    ("heart_rate", "i4"),
+])
+
+# Per-event numeric vitals; strings are UTF-8 encoded. The categorical
+# xl_posture is stored separately as a short string dataset.
+VITALS_DTYPE = np.dtype([
+    ("name", "S16"),
+    ("value", "f8"),
+    ("units", "S16"),
+    ("timestamp", "S32"),
+])
+
+# Vitals whose values are whole numbers; every other numeric vital is a float
+INTEGER_VITALS = frozenset({
+    "heart_rate", "pulse", "spo2", "systolic", "diastolic", "resp_rate",
+})
+
+# Single PCG64 generator for the module; workers replace it (see _seed_worker)
+RNG = np.random.default_rng()
+
+# Time bases as 2*pi*t, shared by every call; scaling by frequency gives phase
+_TWOPI_T_ECG = (2 * np.pi * np.linspace(0, ECG_DURATION_S, ECG_SAMPLES)).astype(np.float32)
+_TWOPI_T_PPG = (2 * np.pi * np.linspace(0, PPG_DURATION_S, PPG_SAMPLES)).astype(np.float32)
+_TWOPI_T_RESP = (2 * np.pi * np.linspace(0, RESP_DURATION_S, RESP_SAMPLES)).astype(np.float32)
+
+# Lead-dependent phase offsets
+_LEAD_PHASES = np.arange(len(ECG_LEADS)) * np.pi / 7
+_LEAD_COS = np.cos(_LEAD_PHASES).astype(np.float32)
+_LEAD_SIN = np.sin(_LEAD_PHASES).astype(np.float32)
+
 # ---------------------------------------------------------------------------
 # Waveform synthesis helpers
 # ---------------------------------------------------------------------------
 
-def _ecg_lead(hr: float, condition: str, n_samples: int, lead_idx: int) -> np.ndarray:
-    """Generate a synthetic ECG-like waveform for one lead."""
-    t = np.linspace(0, ECG_DURATION_S, n_samples, dtype=np.float32)
+# The helpers below chain ufuncs in place (out=) and write into caller-owned
+# buffers, so a file's events reuse the same arrays instead of allocating
+# fresh ones per waveform.
+
+def _ecg_all_leads(
+    hr: float, condition: str, rng: np.random.Generator, noise: np.ndarray, out: np.ndarray
+) -> np.ndarray:
+    """Generate synthetic ECG-like waveforms for all leads into `out`, a (leads, samples) array.
+
+    `noise` is a reusable float32 scratch buffer of that shape, refilled from `rng`.
+    """
     freq = hr / 60.0  # beats per second
+    wt = np.multiply(_TWOPI_T_ECG, np.float32(freq))  # phase at beat frequency
 
     # Base QRS-like composite
-    qrs = np.sin(2 * np.pi * freq * t)
+    qrs = np.sin(wt)
     # T-wave harmonic
-    t_wave = 0.3 * np.sin(2 * np.pi * freq * 0.5 * t + np.pi / 4)
-    # Lead-dependent phase offset
-    phase = lead_idx * np.pi / 7
-    sig = qrs * np.cos(phase) + t_wave * np.sin(phase)
+    t_wave = np.multiply(wt, 0.5)
+    t_wave += np.pi / 4
+    np.sin(t_wave, out=t_wave)
+    t_wave *= 0.3
+    # Lead-dependent phase offset, broadcast across leads
+    sig = np.multiply.outer(_LEAD_COS, qrs, out=out)
+    sig += np.multiply.outer(_LEAD_SIN, t_wave, out=noise)
 
     # Condition-specific modulation
     if condition == "ST":
-        sig += 0.2 * np.ones_like(t)  # ST elevation
+        sig += 0.2  # ST elevation
     elif condition == "VT":
         sig *= 1.5
-        sig += 0.4 * np.sin(2 * np.pi * freq * 2 * t)
+        vt = np.multiply(wt, 2, out=t_wave)
+        np.sin(vt, out=vt)
+        vt *= 0.4
+        sig += vt
     elif condition == "AFIB":
-        sig += 0.15 * np.random.randn(n_samples).astype(np.float32)  # irregular baseline
+        rng.standard_normal(dtype=np.float32, out=noise)
+        noise *= 0.15
+        sig += noise  # irregular baseline
     elif condition == "SB":
         sig *= 0.8
 
     # Small noise
-    sig += 0.02 * np.random.randn(n_samples).astype(np.float32)
+    rng.standard_normal(dtype=np.float32, out=noise)
+    noise *= 0.02
+    sig += noise
     return sig
 
 
-def _ppg_wave(hr: float, n_samples: int) -> np.ndarray:
-    t = np.linspace(0, PPG_DURATION_S, n_samples, dtype=np.float32)
+def _ppg_wave(hr: float, rng: np.random.Generator, noise: np.ndarray, out: np.ndarray) -> np.ndarray:
     freq = hr / 60.0
-    sig = 0.6 * np.sin(2 * np.pi * freq * t) + 0.2 * np.sin(4 * np.pi * freq * t)
-    sig += 0.01 * np.random.randn(n_samples).astype(np.float32)
+    # Phase lives in the noise buffer until the noise is drawn
+    wt = np.multiply(_TWOPI_T_PPG, np.float32(freq), out=noise)
+    sig = np.sin(wt, out=out)
+    sig *= 0.6
+    harmonic = np.multiply(wt, 2, out=wt)
+    np.sin(harmonic, out=harmonic)
+    harmonic *= 0.2
+    sig += harmonic
+    rng.standard_normal(dtype=np.float32, out=noise)
+    noise *= 0.01
+    sig += noise
     return sig
 
 
-def _resp_wave(rr: float, n_samples: int) -> np.ndarray:
-    t = np.linspace(0, RESP_DURATION_S, n_samples, dtype=np.float32)
+def _resp_wave(rr: float, rng: np.random.Generator, noise: np.ndarray, out: np.ndarray) -> np.ndarray:
     freq = rr / 60.0
-    sig = np.sin(2 * np.pi * freq * t)
-    sig += 0.02 * np.random.randn(n_samples).astype(np.float32)
+    sig = np.multiply(_TWOPI_T_RESP, np.float32(freq), out=out)
+    np.sin(sig, out=sig)
+    rng.standard_normal(dtype=np.float32, out=noise)
+    noise *= 0.02
+    sig += noise
     return sig
 
 
-# ---------------------------------------------------------------------------
-# Vitals generation per event
-# ---------------------------------------------------------------------------
+def _randint(rng: np.random.Generator, lo: int, hi: int) -> int:
+    """Inclusive random integer as a Python int."""
+    return int(rng.integers(lo, hi, endpoint=True))
+
 
-def _event_vitals(hr: int, condition: str) -> dict:
+def _event_vitals(hr: int, condition: str, rng: np.random.Generator) -> dict:
     """Generate a vitals snapshot for a single event."""
     if condition == "N":
-        spo2 = random.randint(96, 100)
-        systolic = random.randint(110, 135)
-        diastolic = random.randint(65, 85)
-        rr = random.randint(12, 20)
-        temp = round(random.uniform(36.2, 37.5), 1)
+        spo2 = _randint(rng, 96, 100)
+        systolic = _randint(rng, 110, 135)
+        diastolic = _randint(rng, 65, 85)
+        rr = _randint(rng, 12, 20)
+        temp = round(float(rng.uniform(36.2, 37.5)), 1)
     elif condition == "ST":
-        spo2 = random.randint(93, 98)
-        systolic = random.randint(130, 170)
-        diastolic = random.randint(80, 100)
-        rr = random.randint(18, 28)
-        temp = round(random.uniform(36.5, 38.5), 1)
+        spo2 = _randint(rng, 93, 98)
+        systolic = _randint(rng, 130, 170)
+        diastolic = _randint(rng, 80, 100)
+        rr = _randint(rng, 18, 28)
+        temp = round(float(rng.uniform(36.5, 38.5)), 1)
     elif condition == "SB":
-        spo2 = random.randint(94, 99)
-        systolic = random.randint(90, 115)
-        diastolic = random.randint(55, 75)
-        rr = random.randint(10, 16)
-        temp = round(random.uniform(35.5, 37.0), 1)
+        spo2 = _randint(rng, 94, 99)
+        systolic = _randint(rng, 90, 115)
+        diastolic = _randint(rng, 55, 75)
+        rr = _randint(rng, 10, 16)
+        temp = round(float(rng.uniform(35.5, 37.0)), 1)
     elif condition == "VT":
-        spo2 = random.randint(85, 94)
-        systolic = random.randint(70, 100)
-        diastolic = random.randint(40, 65)
-        rr = random.randint(22, 35)
-        temp = round(random.uniform(36.0, 38.0), 1)
+        spo2 = _randint(rng, 85, 94)
+        systolic = _randint(rng, 70, 100)
+        diastolic = _randint(rng, 40, 65)
+        rr = _randint(rng, 22, 35)
+        temp = round(float(rng.uniform(36.0, 38.0)), 1)
     else:  # AFIB
-        spo2 = random.randint(92, 98)
-        systolic = random.randint(100, 160)
-        diastolic = random.randint(60, 95)
-        rr = random.randint(14, 26)
-        temp = round(random.uniform(36.3, 37.8), 1)
+        spo2 = _randint(rng, 92, 98)
+        systolic = _randint(rng, 100, 160)
+        diastolic = _randint(rng, 60, 95)
+        rr = _randint(rng, 14, 26)
+        temp = round(float(rng.uniform(36.3, 37.8)), 1)
 
     return {
         "heart_rate": {"value": hr, "units": "bpm"},
-        "pulse": {"value": hr + random.randint(-3, 3), "units": "bpm"},
+        "pulse": {"value": hr + _randint(rng, -3, 3), "units": "bpm"},
         "spo2": {"value": spo2, "units": "%"},
         "systolic": {"value": systolic, "units": "mmHg"},
         "diastolic": {"value": diastolic, "units": "mmHg"},
         "resp_rate": {"value": rr, "units": "breaths/min"},
         "temperature": {"value": temp, "units": "°C"},
-        "xl_posture": {"value": random.choice(["Supine", "Left", "Right", "Prone"]), "units": ""},
+        "xl_posture": {"value": POSTURES[rng.integers(len(POSTURES))], "units": ""},
     }
 
 
@@ -141,11 +219,47 @@ def _event_vitals(hr: int, condition: str) -> dict:
 # HDF5 file writer
 # ---------------------------------------------------------------------------
 
+def _write_waveform(group: h5py.Group, name: str, data: np.ndarray) -> h5py.Dataset:
+    """Write a waveform as a single chunk, optionally compressed.
+
+    The chunk is encoded here and written with write_direct_chunk, bypassing
+    the HDF5 filter pipeline. lzf has no stdlib encoder, so it goes through
+    the normal write path.
+    """
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    opts: dict = {"shape": data.shape, "dtype": np.float32, "chunks": data.shape}
+    if WAVEFORM_COMPRESSION:
+        opts["compression"] = WAVEFORM_COMPRESSION
+        opts["shuffle"] = True
+    ds = group.create_dataset(name, **opts)
+    if WAVEFORM_COMPRESSION == "lzf":
+        ds[...] = data
+        return ds
+    payload = data.tobytes()
+    if WAVEFORM_COMPRESSION == "gzip":
+        # Match the filter pipeline: byte-shuffle, then deflate (h5py default level 4)
+        shuffled = data.view(np.uint8).reshape(-1, data.itemsize).T.tobytes()
+        payload = zlib.compress(shuffled, 4)
+    ds.id.write_direct_chunk((0,) * data.ndim, payload)
+    return ds
+
+
 def _write_patient_file(patient_id: str, filepath: str) -> list[dict]:
     """Write one HDF5 file and return event summaries for the index."""
     now = datetime.now(timezone.utc)
-    n_events = random.randint(*EVENTS_PER_PATIENT)
+    rng = RNG
+    n_events = _randint(rng, *EVENTS_PER_PATIENT)
     event_summaries = []
+    index_rows = []
+
+    # Noise scratch and waveform output buffers, reused by every event in
+    # this file; each dataset write copies the data out before the next event
+    ecg_noise = np.empty((len(ECG_LEADS), ECG_SAMPLES), dtype=np.float32)
+    ppg_noise = np.empty(PPG_SAMPLES, dtype=np.float32)
+    resp_noise = np.empty(RESP_SAMPLES, dtype=np.float32)
+    ecg_buf = np.empty_like(ecg_noise)
+    ppg_buf = np.empty_like(ppg_noise)
+    resp_buf = np.empty_like(resp_noise)
 
     with h5py.File(filepath, "w") as f:
         # Metadata group
@@ -157,52 +271,60 @@ def _write_patient_file(patient_id: str, filepath: str) -> list[dict]:
         meta.attrs["device_info"] = "SyntheticMonitor v1.0"
         meta.attrs["created_utc"] = now.isoformat()
 
-        for i in range(n_events):
+        # Event-level metadata for the whole file, drawn up front
+        # Spread events over last 24h
+        offsets_h = rng.uniform(0, 24, n_events)
+        cond_idx = rng.choice(len(CONDITIONS), size=n_events, p=CONDITION_WEIGHTS)
+        hrs = rng.integers(_CONDITION_HR_LO[cond_idx], _CONDITION_HR_HI[cond_idx], endpoint=True)
+        rrs = rng.integers(10, 30, size=n_events, endpoint=True)
+
+        events = zip(offsets_h.tolist(), cond_idx.tolist(), hrs.tolist(), rrs.tolist())
+        for i, (offset_h, ci, hr, rr) in enumerate(events):
             event_id = f"event_{1001 + i}"
-            # Spread events over last 24h
-            offset_h = random.uniform(0, 24)
             event_ts = now - timedelta(hours=offset_h)
-            condition = random.choices(CONDITIONS, weights=CONDITION_WEIGHTS, k=1)[0]
-            hr_lo, hr_hi = CONDITION_HR[condition]
-            hr = random.randint(hr_lo, hr_hi)
+            condition = CONDITIONS[ci]
 
             eg = f.create_group(event_id)
             eg.attrs["condition"] = condition
             eg.attrs["heart_rate"] = hr
             eg.attrs["event_timestamp"] = event_ts.isoformat()
 
-            # Timestamp / UUID datasets
-            eg.create_dataset("timestamp", data=event_ts.isoformat())
-            eg.create_dataset("uuid", data=str(uuid.uuid4()))
-
-            # ECG group — 7 leads
+            # ECG group — 7 leads stacked as one (leads, samples) dataset
             ecg_g = eg.create_group("ecg")
-            for li, lead in enumerate(ECG_LEADS):
-                ecg_g.create_dataset(lead, data=_ecg_lead(hr, condition, ECG_SAMPLES, li))
+            leads = _ecg_all_leads(hr, condition, rng, ecg_noise, ecg_buf)
+            ds = _write_waveform(ecg_g, "leads", leads)
+            ds.attrs["lead_names"] = ECG_LEADS
 
             # PPG
-            eg.create_dataset("ppg", data=_ppg_wave(hr, PPG_SAMPLES))
+            _write_waveform(eg, "ppg", _ppg_wave(hr, rng, ppg_noise, ppg_buf))
 
             # Resp
-            rr = random.randint(10, 30)
-            eg.create_dataset("resp", data=_resp_wave(rr, RESP_SAMPLES))
-
-            # Vitals group
-            vitals = _event_vitals(hr, condition)
-            vg = eg.create_group("vitals")
-            for vname, vdata in vitals.items():
-                ds = vg.create_group(vname)
-                # Store value as string to handle mixed types
-                ds.attrs["value"] = str(vdata["value"])
-                ds.attrs["units"] = vdata["units"]
-                ds.attrs["timestamp"] = event_ts.isoformat()
+            _write_waveform(eg, "resp", _resp_wave(rr, rng, resp_noise, resp_buf))
+
+            # Vitals snapshot — one compound dataset, one row per numeric vital
+            vitals = _event_vitals(hr, condition, rng)
+            posture = vitals.pop("xl_posture")["value"]
+            ts = event_ts.isoformat().encode()
+            rows = [
+                (vname.encode(), vdata["value"], vdata["units"].encode(), ts)
+                for vname, vdata in vitals.items()
+            ]
+            eg.create_dataset("vitals", data=np.array(rows, dtype=VITALS_DTYPE))
+            eg.create_dataset("posture", data=np.bytes_(posture), dtype="S8")
 
             event_summaries.append({
                 "event_id": event_id,
                 "timestamp": event_ts.isoformat(),
+                "ts_epoch": event_ts.timestamp(),
                 "condition": condition,
                 "heart_rate": hr,
             })
+            index_rows.append(
+                (event_id.encode(), str(uuid.uuid4()).encode(), event_ts.timestamp(), condition.encode(), hr)
+            )
+
+        # Per-event identifiers, written once for the whole file
+        f.create_dataset("events_index", data=np.array(index_rows, dtype=EVENTS_INDEX_DTYPE))
 
     return event_summaries
 
@@ -211,17 +333,34 @@ def _write_patient_file(patient_id: str, filepath: str) -> list[dict]:
 # Public API
 # ---------------------------------------------------------------------------
 
+def _seed_worker() -> None:
+    """Give each worker a fresh RNG so forked workers don't share the parent's stream."""
+    global RNG
+    RNG = np.random.default_rng()
+
+
+def _generate_patient(job: tuple[str, str]) -> tuple[str, list[dict]]:
+    pid, filepath = job
+    return pid, _write_patient_file(pid, filepath)
+
+
 def generate_all(patient_ids: list[str]) -> dict[str, list[dict]]:
-    """Generate HDF5 files for all patients, return event index."""
+    """Generate HDF5 files for all patients, return event index.
+
+    Files are independent and CPU-bound, so they are written in parallel
+    across a process pool.
+    """
     os.makedirs(DATA_DIR, exist_ok=True)
     index: dict[str, list[dict]] = {}
-
-    for pid in patient_ids:
-        filename = f"{pid}_2026-02.h5"
-        filepath = os.path.join(DATA_DIR, filename)
-        summaries = _write_patient_file(pid, filepath)
-        # Sort by timestamp descending (most recent first)
-        summaries.sort(key=lambda e: e["timestamp"], reverse=True)
-        index[pid] = summaries
+    if not patient_ids:
+        return index
+
+    jobs = [(pid, os.path.join(DATA_DIR, f"{pid}_2026-02.h5")) for pid in patient_ids]
+    workers = min(len(jobs), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_seed_worker) as ex:
+        for pid, summaries in ex.map(_generate_patient, jobs):
+            # Sort by timestamp descending (most recent first)
+            summaries.sort(key=lambda e: e["ts_epoch"], reverse=True)
+            index[pid] = summaries
 
     return index
@@ -113,6 +113,11 @@ ORDERS: dict[str, dict] = {
 
 _next_order_num = len(ORDERS) + 1
 
+# patient_id -> order_ids in insertion order, kept in step with ORDERS
+PATIENT_ORDERS: dict[str, list[str]] = {}
+for _order in ORDERS.values():
+    PATIENT_ORDERS.setdefault(_order["patient_id"], []).append(_order["order_id"])
+
 
 # ---------------------------------------------------------------------------
 # Request / response models
@@ -137,7 +142,8 @@ def health():
 
 @app.get("/medications/{patient_id}")
 def get_medications(patient_id: str):
-    meds = [o for o in ORDERS.values() if o["patient_id"] == patient_id and o["status"] == "active"]
+    orders = (ORDERS[oid] for oid in PATIENT_ORDERS.get(patient_id, ()))
+    meds = [o for o in orders if o["status"] == "active"]
     if not meds:
         raise HTTPException(status_code=404, detail=f"No active medications for patient {patient_id}")
     return {"patient_id": patient_id, "medications": meds}
@@ -168,4 +174,5 @@ def dispense(req: DispenseRequest):
         "prescribed_at": datetime.now(timezone.utc).isoformat(),
     }
     ORDERS[order_id] = order
+    PATIENT_ORDERS.setdefault(req.patient_id, []).append(order_id)
     return order
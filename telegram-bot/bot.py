@@ -1,13 +1,21 @@
 """Telegram bot bridge — forwards messages to the clinibot gateway with rich rendering."""
 
+import asyncio
 import json
 import logging
 import os
+import time
 import traceback
+from collections.abc import Iterator
+from dataclasses import dataclass
 
 import httpx
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+import orjson
+from telegram import Chat, InlineKeyboardButton, InlineKeyboardMarkup, Message, Update
+from telegram.constants import ChatAction
+from telegram.error import TelegramError
 from telegram.ext import (
+    AIORateLimiter,
     ApplicationBuilder,
     CallbackQueryHandler,
     CommandHandler,
@@ -17,43 +25,121 @@ from telegram.ext import (
 )
 from telegram.request import HTTPXRequest
 
+try:
+    import uvloop
+except ImportError:  # optional; not available on Windows
+    uvloop = None
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
 )
 logger = logging.getLogger("telegram-bot")
 
-TELEGRAM_BOT_TOKEN = os.environ["TELEGRAM_BOT_TOKEN"]
-GATEWAY_URL = os.environ.get("GATEWAY_URL", "http://clinibot-gateway:3000")
-TENANT_ID = os.environ.get("TENANT_ID", "default")
-_API_KEY = os.environ.get("API_KEY", "")
+WEBHOOK_PATH = "telegram"
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Bot settings, read from the environment once in main()."""
+
+    token: str
+    gateway_url: str
+    tenant_id: str
+    api_key: str
+    # Webhook mode: webhook_url is the public base URL that routes to this
+    # container. Empty keeps long polling.
+    webhook_url: str
+    webhook_port: int
+    webhook_secret: str
+
+    @classmethod
+    def from_env(cls) -> "Config":
+        return cls(
+            token=os.environ["TELEGRAM_BOT_TOKEN"],
+            gateway_url=os.environ.get("GATEWAY_URL", "http://clinibot-gateway:3000"),
+            tenant_id=os.environ.get("TENANT_ID", "default"),
+            api_key=os.environ.get("API_KEY", ""),
+            webhook_url=os.environ.get("TELEGRAM_WEBHOOK_URL", "").rstrip("/"),
+            webhook_port=int(os.environ.get("TELEGRAM_WEBHOOK_PORT", "8443")),
+            webhook_secret=os.environ.get("TELEGRAM_WEBHOOK_SECRET", ""),
+        )
 
-def _auth_headers() -> dict[str, str]:
-    """Return Authorization header if API_KEY is set."""
-    if _API_KEY:
-        return {"Authorization": f"Bearer {_API_KEY}"}
-    return {}
+    def auth_headers(self) -> dict[str, str]:
+        """Return Authorization header if API_KEY is set."""
+        if self.api_key:
+            return {"Authorization": f"Bearer {self.api_key}"}
+        return {}
 
 TG_MAX_LENGTH = 4096
 
+_ERR_HTTP = (
+    "Sorry, something went wrong while processing your request. "
+    "Please try again later."
+)
+_ERR_UNREACHABLE = (
+    "Sorry, the clinical gateway is currently unreachable. "
+    "Please try again in a moment."
+)
+
 
-def split_message(text: str, limit: int = TG_MAX_LENGTH) -> list[str]:
-    """Split text into chunks that fit within the Telegram message limit."""
-    if len(text) <= limit:
-        return [text]
-    chunks: list[str] = []
-    while text:
-        if len(text) <= limit:
-            chunks.append(text)
-            break
-        split_at = text.rfind("\n", 0, limit)
-        if split_at == -1:
-            split_at = text.rfind(" ", 0, limit)
-        if split_at == -1:
-            split_at = limit
-        chunks.append(text[:split_at])
-        text = text[split_at:].lstrip("\n")
-    return chunks
+def split_message(text: str, limit: int = TG_MAX_LENGTH) -> Iterator[str]:
+    """Yield chunks of text that fit within the Telegram message limit.
+
+    Advances an index through the string instead of re-slicing the
+    remainder, so long responses are copied only once. Each break search
+    is bounded to the current window, so the whole text is scanned once in
+    C; pre-indexing every break with re.finditer + bisect measured 100x+
+    slower, since each match becomes a Python object.
+    """
+    start, n = 0, len(text)
+    while n - start > limit:
+        end = start + limit
+        split_at = text.rfind("\n", start, end)
+        if split_at <= start:
+            split_at = text.rfind(" ", start, end)
+        if split_at <= start:
+            split_at = end
+        yield text[start:split_at]
+        start = split_at
+        while start < n and text[start] == "\n":
+            start += 1
+    if start < n or n == 0:
+        yield text[start:]
+
+
+async def _reply_chunks(message: Message, text: str, **kwargs) -> None:
+    """Reply with text split to the Telegram limit, one message per chunk.
+
+    Chunks go to the same chat, so they are sent strictly one after another:
+    overlapping the requests could reorder the parts, and AIORateLimiter
+    already spaces them within the flood limits.
+    """
+    for chunk in split_message(text):
+        await message.reply_text(chunk, **kwargs)
+
+
+class _OrjsonRequest(HTTPXRequest):
+    """HTTPXRequest that parses Bot API responses with orjson."""
+
+    @staticmethod
+    def parse_json_payload(payload: bytes) -> dict:
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            # Fall back to PTB's lenient decode (invalid UTF-8 is replaced)
+            return HTTPXRequest.parse_json_payload(payload)
+
+
+def _bot_request(connection_pool_size: int) -> _OrjsonRequest:
+    return _OrjsonRequest(
+        connection_pool_size=connection_pool_size,
+        read_timeout=30.0,
+        write_timeout=30.0,
+        connect_timeout=10.0,
+        pool_timeout=30.0,
+        http_version="2",
+    )
 
 
 async def _verify_bot_identity(app) -> None:
@@ -63,6 +149,151 @@ async def _verify_bot_identity(app) -> None:
     logger.info("Bot identity: @%s (id=%s)", me.username, me.id)
 
 
+async def _post_init(app) -> None:
+    """Open the shared gateway client and verify the bot token."""
+    cfg: Config = app.bot_data["config"]
+    app.bot_data["http"] = httpx.AsyncClient(
+        base_url=cfg.gateway_url,
+        headers=cfg.auth_headers(),
+        timeout=120.0,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=300.0),
+        # httpx negotiates HTTP/2 via TLS ALPN only; over plain http it stays on 1.1
+        http2=cfg.gateway_url.startswith("https://"),
+    )
+    await _verify_bot_identity(app)
+
+
+async def _post_shutdown(app) -> None:
+    """Close the shared gateway client."""
+    client = app.bot_data.pop("http", None)
+    if client is not None:
+        await client.aclose()
+
+
+def _gateway(context: ContextTypes.DEFAULT_TYPE) -> httpx.AsyncClient:
+    """Return the long-lived gateway client, reused across messages."""
+    return context.application.bot_data["http"]
+
+
+class GatewayUnavailable(Exception):
+    """Raised without calling the gateway while the circuit breaker is open."""
+
+
+class _CircuitBreaker:
+    """Fail fast after repeated gateway failures instead of waiting on timeouts.
+
+    Opens after fail_max consecutive failures. Once reset_timeout has passed,
+    one trial call is let through (half-open) and no other call is admitted
+    until it finishes; success closes the breaker, another failure re-opens
+    it for a further reset_timeout.
+    """
+
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 30.0) -> None:
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if self._trial_in_flight:
+            return False
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._trial_in_flight = False
+        self._failures += 1
+        if self._failures >= self.fail_max:
+            if self._opened_at is None:
+                logger.warning("Gateway circuit open after %d failures", self._failures)
+            self._opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        self._trial_in_flight = False
+
+
+_breaker = _CircuitBreaker()
+
+
+async def _gateway_post(context: ContextTypes.DEFAULT_TYPE, path: str, **kwargs) -> dict:
+    """POST to the gateway through the circuit breaker and return the JSON body."""
+    if not _breaker.allow():
+        raise GatewayUnavailable("gateway circuit is open")
+    try:
+        resp = await _gateway(context).post(path, **kwargs)
+        resp.raise_for_status()
+    except httpx.TransportError:
+        _breaker.record_failure()
+        raise
+    except httpx.HTTPStatusError as exc:
+        # A 4xx means the gateway is up and rejected this request
+        if exc.response.status_code >= 500:
+            _breaker.record_failure()
+        else:
+            _breaker.record_success()
+        raise
+    except BaseException:
+        # Says nothing about gateway health (e.g. the handler was cancelled);
+        # free the half-open trial slot so the next caller can probe.
+        _breaker.release_trial()
+        raise
+    _breaker.record_success()
+    return orjson.loads(resp.content)
+
+
+async def _keep_typing(chat: Chat) -> None:
+    """Show the typing indicator until cancelled; Telegram clears it after ~5 s."""
+    while True:
+        try:
+            await chat.send_action(ChatAction.TYPING)
+        except TelegramError as exc:
+            logger.debug("send_action failed: %s", exc)
+        await asyncio.sleep(4)
+
+
+def _chat_body(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user_id: str, message: str) -> bytes:
+    """Encode a /chat request body, reusing the chat's pre-encoded fixed fields.
+
+    channel, tenant_id and session_id never change for a chat, so they are
+    encoded once and kept in chat_data; only user_id and message are encoded
+    per call.
+    """
+    prefix = context.chat_data.get("payload_prefix")
+    if prefix is None:
+        tenant_id = context.bot_data["config"].tenant_id
+        fixed = {"channel": "telegram", "tenant_id": tenant_id, "session_id": f"tg-{chat_id}"}
+        prefix = json.dumps(fixed)[:-1].encode() + b", "
+        context.chat_data["payload_prefix"] = prefix
+    return b"%s\"user_id\": %s, \"message\": %s}" % (
+        prefix, json.dumps(user_id).encode(), json.dumps(message).encode()
+    )
+
+
+async def _post_chat(context: ContextTypes.DEFAULT_TYPE, chat: Chat, body: bytes) -> dict:
+    """POST to the gateway's /chat, showing the typing indicator while it runs.
+
+    The indicator goes out alongside the request, so the user sees activity
+    straight away instead of only after the full response has been built.
+    """
+    typing = asyncio.create_task(_keep_typing(chat))
+    try:
+        return await _gateway_post(
+            context, "/chat", content=body, headers={"Content-Type": "application/json"}
+        )
+    finally:
+        typing.cancel()
+
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /start command."""
     await update.message.reply_text(
@@ -80,36 +311,20 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if not text:
         return
 
-    session_id = f"tg-{chat_id}"
-
-    payload = {
-        "message": text,
-        "user_id": user_id,
-        "channel": "telegram",
-        "tenant_id": TENANT_ID,
-        "session_id": session_id,
-    }
+    body = _chat_body(context, chat_id, user_id, text)
 
-    logger.info("chat_id=%s user=%s message=%r", chat_id, user_id, text[:80])
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("chat_id=%s user=%s message=%r", chat_id, user_id, text[:80])
 
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            resp = await client.post(f"{GATEWAY_URL}/chat", json=payload, headers=_auth_headers())
-            resp.raise_for_status()
-            data = resp.json()
+        data = await _post_chat(context, update.effective_chat, body)
     except httpx.HTTPStatusError as exc:
         logger.error("Gateway HTTP error: %s", exc)
-        await update.message.reply_text(
-            "Sorry, something went wrong while processing your request. "
-            "Please try again later."
-        )
+        await update.message.reply_text(_ERR_HTTP)
         return
-    except (httpx.ConnectError, httpx.TimeoutException) as exc:
+    except (httpx.TransportError, GatewayUnavailable) as exc:
         logger.error("Gateway unreachable: %s", exc)
-        await update.message.reply_text(
-            "Sorry, the clinical gateway is currently unreachable. "
-            "Please try again in a moment."
-        )
+        await update.message.reply_text(_ERR_UNREACHABLE)
         return
 
     blocks = data.get("blocks")
@@ -118,8 +333,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if blocks:
         await _send_rich_blocks(update, blocks, response_text)
     else:
-        for chunk in split_message(response_text):
-            await update.message.reply_text(chunk)
+        await _reply_chunks(update.message, response_text)
 
 
 async def _send_rich_blocks(update: Update, blocks: list[dict], fallback_text: str) -> None:
@@ -132,8 +346,7 @@ async def _send_rich_blocks(update: Update, blocks: list[dict], fallback_text: s
         if btype == "text":
             html = block.get("html", block.get("content", ""))
             if html:
-                for chunk in split_message(html):
-                    await update.message.reply_text(chunk, parse_mode="HTML")
+                await _reply_chunks(update.message, html, parse_mode="HTML")
                 sent_any = True
 
         elif btype == "inline_keyboard":
@@ -184,8 +397,7 @@ async def _send_rich_blocks(update: Update, blocks: list[dict], fallback_text: s
 
     # Always send the text summary
     if fallback_text:
-        for chunk in split_message(fallback_text):
-            await update.message.reply_text(chunk, parse_mode="HTML")
+        await _reply_chunks(update.message, fallback_text, parse_mode="HTML")
 
 
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -204,7 +416,6 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     chat_id = update.effective_chat.id
     user_id = str(update.effective_user.id)
-    session_id = f"tg-{chat_id}"
 
     if action == "confirm":
         # Confirmation button → POST to /confirm/{id}
@@ -213,10 +424,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             await query.edit_message_text("Missing confirmation ID.")
             return
         try:
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                resp = await client.post(f"{GATEWAY_URL}/confirm/{cid}", headers=_auth_headers())
-                resp.raise_for_status()
-                result = resp.json()
+            result = await _gateway_post(context, f"/confirm/{cid}")
             result_text = json.dumps(result.get("result", result), indent=2)
             await query.edit_message_text(f"Confirmed.\n<pre>{result_text[:3000]}</pre>", parse_mode="HTML")
         except Exception as exc:
@@ -229,19 +437,10 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     param_str = " ".join(f"{v}" for v in params.values())
     synthetic_message = f"{label} {param_str}".strip()
 
-    payload = {
-        "message": synthetic_message,
-        "user_id": user_id,
-        "channel": "telegram",
-        "tenant_id": TENANT_ID,
-        "session_id": session_id,
-    }
+    body = _chat_body(context, chat_id, user_id, synthetic_message)
 
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            resp = await client.post(f"{GATEWAY_URL}/chat", json=payload, headers=_auth_headers())
-            resp.raise_for_status()
-            resp_data = resp.json()
+        resp_data = await _post_chat(context, update.effective_chat, body)
     except Exception as exc:
         logger.error("Callback chat error: %s", exc)
         await query.edit_message_text(f"Error: {exc}")
@@ -283,8 +482,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                         await msg.reply_text(f"[Image: {alt}]\n{url}")
 
     if response_text:
-        for chunk in split_message(response_text):
-            await msg.reply_text(chunk, parse_mode="HTML")
+        await _reply_chunks(msg, response_text, parse_mode="HTML")
 
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -293,26 +491,59 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
     logger.debug(traceback.format_exc())
 
 
+# Built once at import so repeated main() calls (tests, reloads) reuse them
+TEXT_NON_COMMAND = filters.TEXT & ~filters.COMMAND
+
+HANDLERS = (
+    CommandHandler("start", start),
+    MessageHandler(TEXT_NON_COMMAND, handle_message),
+    CallbackQueryHandler(handle_callback),
+)
+
+
 def main() -> None:
-    logger.info("Starting Telegram bot (gateway=%s, tenant=%s)", GATEWAY_URL, TENANT_ID)
+    cfg = Config.from_env()
+    logger.info("Starting Telegram bot (gateway=%s, tenant=%s)", cfg.gateway_url, cfg.tenant_id)
+    if uvloop is not None:
+        # PTB creates its loop from the policy when run_polling/run_webhook starts
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     app = (
         ApplicationBuilder()
-        .token(TELEGRAM_BOT_TOKEN)
-        .read_timeout(30.0)
-        .write_timeout(30.0)
-        .connect_timeout(15.0)
-        .pool_timeout(30.0)
+        .token(cfg.token)
+        # Enough API connections for concurrent replies; getUpdates only ever
+        # has one long poll in flight
+        .request(_bot_request(connection_pool_size=32))
+        .get_updates_request(_bot_request(connection_pool_size=1))
+        # Spaces outbound sends within Telegram's flood limits (30 msg/s
+        # overall, 20 msg/min per group) and retries up to 3 times on RetryAfter
+        .rate_limiter(AIORateLimiter(overall_max_rate=30, overall_time_period=1, max_retries=3))
+        .post_init(_post_init)
+        .post_shutdown(_post_shutdown)
         .build()
     )
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-    app.add_handler(CallbackQueryHandler(handle_callback))
+    app.bot_data["config"] = cfg
+    app.add_handlers(HANDLERS)
     app.add_error_handler(error_handler)
-    app.post_init = _verify_bot_identity
-    app.run_polling(
-        drop_pending_updates=True,
-        allowed_updates=["message", "callback_query"],
-    )
+    allowed_updates = ["message", "callback_query"]
+    if cfg.webhook_url:
+        if not cfg.webhook_secret:
+            raise SystemExit("TELEGRAM_WEBHOOK_SECRET is required when TELEGRAM_WEBHOOK_URL is set")
+        # Telegram pushes updates; no getUpdates traffic while idle
+        logger.info("Receiving updates via webhook at %s/%s", cfg.webhook_url, WEBHOOK_PATH)
+        app.run_webhook(
+            listen="0.0.0.0",
+            port=cfg.webhook_port,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{cfg.webhook_url}/{WEBHOOK_PATH}",
+            secret_token=cfg.webhook_secret,
+            drop_pending_updates=True,
+            allowed_updates=allowed_updates,
+        )
+    else:
+        app.run_polling(
+            drop_pending_updates=True,
+            allowed_updates=allowed_updates,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+"""Unit tests for the deferred audit writer."""
+
+import asyncio
+import logging
+import os
+import sys
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "clinibot"))
+
+import audit
+
+SCHEMA = os.path.join(os.path.dirname(__file__), "..", "schema", "init.sql")
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+
+@pytest_asyncio.fixture
+async def audit_db(tmp_path):
+    await audit.init_db(str(tmp_path / "audit.db"), SCHEMA)
+    await audit.start_writer()
+    yield
+    await audit.stop_writer()
+    await audit.close_db()
+
+
+async def _log(n: int) -> None:
+    for i in range(n):
+        await audit.log_action_deferred(
+            tenant_id="t", session_id="s", user_id="u", channel="test", action=f"a{i}",
+        )
+
+
+async def _row_count() -> int:
+    cur = await audit._db.execute("SELECT COUNT(*) FROM audit_log")
+    return (await cur.fetchone())[0]
+
+
+# ---------------------------------------------------------------------------
+# Writer failure paths
+# ---------------------------------------------------------------------------
+
+
+class TestAuditWriter:
+    @pytest.mark.asyncio
+    async def test_batch_failure_falls_back_to_per_row_writes(self, audit_db):
+        """A failed batch is rolled back and every row is written individually."""
+        async def partial_then_fail(db, sql, rows):
+            await db.execute(sql, rows[0])
+            raise RuntimeError("disk I/O error")
+
+        with patch("audit.retry_executemany", side_effect=partial_then_fail):
+            await _log(3)
+            await audit._audit_queue.join()
+        assert await _row_count() == 3
+
+    @pytest.mark.asyncio
+    async def test_per_row_failure_escalates(self, audit_db, caplog):
+        """Rows that cannot be written even one at a time are logged at CRITICAL."""
+        failing = AsyncMock(side_effect=RuntimeError("disk I/O error"))
+        with patch("audit.retry_executemany", failing), patch("audit.retry_execute", failing):
+            with caplog.at_level(logging.CRITICAL, logger="clinibot.audit"):
+                await _log(2)
+                await audit._audit_queue.join()
+        critical = [r for r in caplog.records if r.levelno == logging.CRITICAL]
+        assert len(critical) == 2
+        assert not audit._writer_task.done()
+
+    @pytest.mark.asyncio
+    async def test_dead_writer_does_not_hang_shutdown(self, tmp_path):
+        """Rows queued before the writer died are written at shutdown; new rows bypass it."""
+        await audit.init_db(str(tmp_path / "audit.db"), SCHEMA)
+        await audit.start_writer()
+        try:
+            audit._writer_task.cancel()
+            await asyncio.gather(audit._writer_task, return_exceptions=True)
+            audit._audit_queue.put_nowait(audit._action_row("t", "s", "u", "test", "queued"))
+
+            await _log(1)  # writer is dead, so this is written synchronously
+            assert await _row_count() == 1
+
+            await asyncio.wait_for(audit.stop_writer(), timeout=5)
+            assert await _row_count() == 2
+        finally:
+            await audit.stop_writer()
+            await audit.close_db()
@@ -216,3 +216,92 @@ class TestWardRoundsParallel:
         # Both scans returned empty
         assert patients[0]["latest_scan"] is None
         assert patients[1]["latest_scan"] is None
+
+
+# ---------------------------------------------------------------------------
+# GET response cache
+# ---------------------------------------------------------------------------
+
+
+class _FakeDispatchResponse(_FakeResponse):
+    def __init__(self, status_code, data):
+        super().__init__(status_code, data)
+        self.content = self.text.encode()
+
+    def raise_for_status(self):
+        pass
+
+
+class TestResponseCache:
+    @pytest.mark.asyncio
+    async def test_repeated_get_served_from_cache(self):
+        """Identical GET tool calls hit the backend once; writes invalidate."""
+        import tools
+
+        tools._response_cache.clear()
+        mock_client = AsyncMock()
+        mock_client.get = AsyncMock(return_value=_FakeDispatchResponse(200, {"patient_id": "P001", "hr": 80}))
+        mock_client.post = AsyncMock(return_value=_FakeDispatchResponse(200, {"status": "ok"}))
+        session = _make_session()
+
+        with patch("tools._http_client", mock_client):
+            first = await tools._dispatch("get_vitals", {"patient_id": "P001"}, session)
+            first["_analysis"] = {}  # caller mutation must not leak into the cache
+            second = await tools._dispatch("get_vitals", {"patient_id": "P001"}, session)
+            assert mock_client.get.await_count == 1
+            assert second == {"patient_id": "P001", "hr": 80}
+
+            await tools._dispatch("initiate_code_blue", {"patient_id": "P001"}, session)
+            await tools._dispatch("get_vitals", {"patient_id": "P001"}, session)
+            assert mock_client.get.await_count == 2
+
+        tools._response_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_nested_mutation_does_not_leak_into_cache(self):
+        """Mutating a nested value in a cached result leaves the cache intact."""
+        import tools
+
+        tools._response_cache.clear()
+        mock_client = AsyncMock()
+        mock_client.get = AsyncMock(return_value=_FakeDispatchResponse(200, {"meds": [{"name": "aspirin"}]}))
+        session = _make_session()
+
+        with patch("tools._http_client", mock_client):
+            first = await tools._dispatch("get_medications", {"patient_id": "P001"}, session)
+            first["meds"][0]["name"] = "changed"
+            first["meds"].append({"name": "extra"})
+            second = await tools._dispatch("get_medications", {"patient_id": "P001"}, session)
+            assert mock_client.get.await_count == 1
+            assert second == {"meds": [{"name": "aspirin"}]}
+
+        tools._response_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_get_in_flight_during_write_is_not_cached(self):
+        """A GET that completes after a concurrent write must not be cached."""
+        import tools
+
+        tools._response_cache.clear()
+        get_started = asyncio.Event()
+        write_done = asyncio.Event()
+
+        async def slow_get(*args, **kwargs):
+            get_started.set()
+            await write_done.wait()
+            return _FakeDispatchResponse(200, {"patient_id": "P001", "hr": 80})
+
+        mock_client = AsyncMock()
+        mock_client.get = AsyncMock(side_effect=slow_get)
+        mock_client.post = AsyncMock(return_value=_FakeDispatchResponse(200, {"status": "ok"}))
+        session = _make_session()
+
+        with patch("tools._http_client", mock_client):
+            get_task = asyncio.create_task(tools._dispatch("get_vitals", {"patient_id": "P001"}, session))
+            await get_started.wait()
+            await tools._dispatch("initiate_code_blue", {"patient_id": "P001"}, session)
+            write_done.set()
+            await get_task
+            assert tools._response_cache == {}
+
+        tools._response_cache.clear()
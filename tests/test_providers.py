@@ -231,3 +231,22 @@ class TestBuildToolDefinitions:
         names = {d["name"] for d in defs}
         for name in _TOOL_DESCRIPTIONS:
             assert name in names, f"{name} in _TOOL_DESCRIPTIONS but not in build_tool_definitions()"
+
+    def test_reload_refreshes_parameters(self, tmp_path):
+        """Memoized parameter schemas are rebuilt when tools config is reloaded."""
+        config_path = tmp_path / "tools.json"
+        try:
+            config_path.write_text(json.dumps({"tools": {"get_vitals": {"params": {
+                "patient_id": {"type": "string", "required": True}}}}}))
+            load_tools_config(str(config_path))
+            defs = {d["name"]: d for d in build_tool_definitions()}
+            assert defs["get_vitals"]["parameters"]["required"] == ["patient_id"]
+
+            config_path.write_text(json.dumps({"tools": {"get_vitals": {"params": {
+                "patient_id": {"type": "string"}}}}}))
+            load_tools_config(str(config_path))
+            defs = {d["name"]: d for d in build_tool_definitions()}
+            assert "required" not in defs["get_vitals"]["parameters"]
+        finally:
+            real_path = os.path.join(os.path.dirname(__file__), "..", "config", "tools.json")
+            load_tools_config(real_path)
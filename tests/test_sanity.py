@@ -9,10 +9,12 @@ Run:
     pytest tests/test_sanity.py -v
 """
 
+import asyncio
 import json
 
 import httpx
 import pytest
+import pytest_asyncio
 
 BASE = "http://localhost:3000"
 TIMEOUT = 120.0  # LLM inference can be slow with local models
@@ -29,122 +31,111 @@ EXPECTED_BACKENDS = {
 }
 
 
-@pytest.fixture(scope="module")
-def client():
-    with httpx.Client(base_url=BASE, timeout=TIMEOUT) as c:
+# Tests share the module's event loop so they can reuse the one async client
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def aclient():
+    # One pooled client for the module; every test reuses its warm connection
+    limits = httpx.Limits(max_keepalive_connections=5, max_connections=10)
+    async with httpx.AsyncClient(base_url=BASE, timeout=TIMEOUT, limits=limits) as c:
         yield c
 
 
 # ── 1. Health endpoint ──────────────────────────────────────────────
 
 
-def test_health_returns_200(client):
-    r = client.get("/health")
+async def test_health_returns_200(aclient):
+    r = await aclient.get("/health")
     assert r.status_code == 200
     body = r.json()
     assert body["status"] in ("ok", "degraded")
     assert isinstance(body["backends"], dict)
 
 
-def test_health_lists_all_backends(client):
-    r = client.get("/health")
+async def test_health_lists_all_backends(aclient):
+    r = await aclient.get("/health")
     body = r.json()
     assert set(body["backends"].keys()) == EXPECTED_BACKENDS
 
 
 # ── 2. Chat endpoint ────────────────────────────────────────────────
 
+BASE_PAYLOAD = {"user_id": "test-user", "channel": "webchat", "tenant_id": "test"}
 
-def test_chat_basic(client):
-    r = client.post(
-        "/chat",
-        json={
-            "message": "Show vitals for P001",
-            "user_id": "test-user",
-            "channel": "webchat",
-            "tenant_id": "test",
-        },
-    )
+
+async def _chat(client, message, **overrides):
+    """POST /chat with BASE_PAYLOAD, overridden per test."""
+    return await client.post("/chat", json={**BASE_PAYLOAD, "message": message, **overrides})
+
+
+# Telegram responses must also fit the 4096-char message limit
+@pytest.mark.parametrize(
+    "channel, max_len",
+    [("webchat", None), ("telegram", 4096)],
+)
+async def test_chat_basic(aclient, channel, max_len):
+    r = await _chat(aclient, "Show vitals for P001", channel=channel)
     assert r.status_code == 200
     body = r.json()
     assert "response" in body
     assert "session_id" in body
+    if max_len is not None:
+        assert len(body["response"]) <= max_len
 
 
 # ── 3. Session continuity ───────────────────────────────────────────
 
 
-def test_chat_session_continuity(client):
+async def test_chat_session_continuity(aclient):
     # First message — start a new session
-    r1 = client.post(
-        "/chat",
-        json={
-            "message": "Show vitals for P001",
-            "user_id": "test-user",
-            "channel": "webchat",
-            "tenant_id": "test",
-        },
-    )
+    r1 = await _chat(aclient, "Show vitals for P001")
     assert r1.status_code == 200
     sid = r1.json()["session_id"]
 
     # Follow-up — same session
-    r2 = client.post(
-        "/chat",
-        json={
-            "message": "What about P002?",
-            "user_id": "test-user",
-            "channel": "webchat",
-            "tenant_id": "test",
-            "session_id": sid,
-        },
-    )
+    r2 = await _chat(aclient, "What about P002?", session_id=sid)
     assert r2.status_code == 200
     assert r2.json()["session_id"] == sid
 
 
-# ── 4. Telegram channel respects max length ─────────────────────────
+# ── 4. Confirm with invalid ID ──────────────────────────────────────
 
 
-def test_chat_telegram_max_length(client):
-    r = client.post(
-        "/chat",
-        json={
-            "message": "Show vitals for P001",
-            "user_id": "test-user",
-            "channel": "telegram",
-            "tenant_id": "test",
-        },
-    )
-    assert r.status_code == 200
+async def test_confirm_invalid_id(aclient):
+    r = await aclient.post("/confirm/invalid-id-does-not-exist")
     body = r.json()
-    assert len(body["response"]) <= 4096
+    # Gateway returns 200 with error nested in result
+    assert r.status_code in (400, 404, 422) or "error" in str(body)
 
 
-# ── 5. Confirm with invalid ID ──────────────────────────────────────
+# ── 5. Parallel smoke ──────────────────────────────────────────────
 
 
-def test_confirm_invalid_id(client):
-    r = client.post("/confirm/invalid-id-does-not-exist")
-    body = r.json()
-    # Gateway returns 200 with error nested in result
-    assert r.status_code in (400, 404, 422) or "error" in str(body)
+async def test_smoke_parallel(aclient):
+    """Independent health/chat/confirm calls all succeed when issued concurrently."""
+    health, webchat, telegram, confirm = await asyncio.gather(
+        aclient.get("/health"),
+        _chat(aclient, "Show vitals for P001"),
+        _chat(aclient, "Show vitals for P001", channel="telegram"),
+        aclient.post("/confirm/invalid-id-does-not-exist"),
+    )
+    assert health.status_code == 200
+    assert set(health.json()["backends"].keys()) == EXPECTED_BACKENDS
+    assert webchat.status_code == 200
+    assert "session_id" in webchat.json()
+    assert telegram.status_code == 200
+    assert len(telegram.json()["response"]) <= 4096
+    assert confirm.status_code in (400, 404, 422) or "error" in str(confirm.json())
 
 
 # ── 6. Structured rich response (blocks) ──────────────────────────
 
 
-def test_chat_response_contains_blocks_key(client):
+async def test_chat_response_contains_blocks_key(aclient):
     """Response always contains a 'blocks' key (may be null)."""
-    r = client.post(
-        "/chat",
-        json={
-            "message": "hello",
-            "user_id": "test-user",
-            "channel": "webchat",
-            "tenant_id": "test",
-        },
-    )
+    r = await _chat(aclient, "hello")
     assert r.status_code == 200
     body = r.json()
     assert "blocks" in body
@@ -152,17 +143,9 @@ def test_chat_response_contains_blocks_key(client):
     assert "session_id" in body
 
 
-def test_chat_vitals_returns_blocks_webchat(client):
+async def test_chat_vitals_returns_blocks_webchat(aclient):
     """Vitals query should return data_table block for webchat (passthrough)."""
-    r = client.post(
-        "/chat",
-        json={
-            "message": "vitals for P001",
-            "user_id": "test-blocks",
-            "channel": "webchat",
-            "tenant_id": "test-blocks",
-        },
-    )
+    r = await _chat(aclient, "vitals for P001", user_id="test-blocks", tenant_id="test-blocks")
     assert r.status_code == 200
     body = r.json()
     blocks = body.get("blocks")
@@ -175,16 +158,14 @@ def test_chat_vitals_returns_blocks_webchat(client):
         assert "rows" in table
 
 
-def test_chat_vitals_telegram_rendered_html(client):
+async def test_chat_vitals_telegram_rendered_html(aclient):
     """Telegram blocks should be rendered as HTML text, not raw data_table."""
-    r = client.post(
-        "/chat",
-        json={
-            "message": "vitals for P001",
-            "user_id": "test-blocks",
-            "channel": "telegram",
-            "tenant_id": "test-blocks-tg",
-        },
+    r = await _chat(
+        aclient,
+        "vitals for P001",
+        user_id="test-blocks",
+        channel="telegram",
+        tenant_id="test-blocks-tg",
     )
     assert r.status_code == 200
     body = r.json()
@@ -196,17 +177,9 @@ def test_chat_vitals_telegram_rendered_html(client):
         assert any("html" in b for b in text_blocks)
 
 
-def test_chat_blood_availability_returns_blocks(client):
+async def test_chat_blood_availability_returns_blocks(aclient):
     """Blood availability should return a data_table block."""
-    r = client.post(
-        "/chat",
-        json={
-            "message": "blood availability",
-            "user_id": "test-blocks",
-            "channel": "webchat",
-            "tenant_id": "test-blocks",
-        },
-    )
+    r = await _chat(aclient, "blood availability", user_id="test-blocks", tenant_id="test-blocks")
     assert r.status_code == 200
     body = r.json()
     blocks = body.get("blocks")
@@ -215,17 +188,9 @@ def test_chat_blood_availability_returns_blocks(client):
         assert "data_table" in types
 
 
-def test_chat_code_blue_returns_confirmation_block(client):
+async def test_chat_code_blue_returns_confirmation_block(aclient):
     """Critical action should return a confirmation block with button."""
-    r = client.post(
-        "/chat",
-        json={
-            "message": "code blue for P001",
-            "user_id": "test-blocks",
-            "channel": "webchat",
-            "tenant_id": "test-blocks-confirm",
-        },
-    )
+    r = await _chat(aclient, "code blue for P001", user_id="test-blocks", tenant_id="test-blocks-confirm")
     assert r.status_code == 200
     body = r.json()
     blocks = body.get("blocks")
@@ -237,16 +202,14 @@ def test_chat_code_blue_returns_confirmation_block(client):
         assert len(conf.get("buttons", [])) > 0
 
 
-def test_chat_code_blue_telegram_has_confirm_button(client):
+async def test_chat_code_blue_telegram_has_confirm_button(aclient):
     """Telegram confirmation block should have inline keyboard callback_data."""
-    r = client.post(
-        "/chat",
-        json={
-            "message": "code blue for P001",
-            "user_id": "test-blocks",
-            "channel": "telegram",
-            "tenant_id": "test-blocks-tg-confirm",
-        },
+    r = await _chat(
+        aclient,
+        "code blue for P001",
+        user_id="test-blocks",
+        channel="telegram",
+        tenant_id="test-blocks-tg-confirm",
     )
     assert r.status_code == 200
     body = r.json()
@@ -262,16 +225,14 @@ def test_chat_code_blue_telegram_has_confirm_button(client):
         assert "confirmation_id" in params
 
 
-def test_chat_slack_blocks_are_block_kit(client):
+async def test_chat_slack_blocks_are_block_kit(aclient):
     """Slack blocks should use Block Kit format (section type)."""
-    r = client.post(
-        "/chat",
-        json={
-            "message": "blood availability",
-            "user_id": "test-blocks",
-            "channel": "slack",
-            "tenant_id": "test-blocks-slack",
-        },
+    r = await _chat(
+        aclient,
+        "blood availability",
+        user_id="test-blocks",
+        channel="slack",
+        tenant_id="test-blocks-slack",
     )
     assert r.status_code == 200
     body = r.json()
@@ -282,16 +243,14 @@ def test_chat_slack_blocks_are_block_kit(client):
         assert any(b.get("type") in ("section", "rendered_image") for b in blocks)
 
 
-def test_chat_whatsapp_filters_unsupported_blocks(client):
+async def test_chat_whatsapp_filters_unsupported_blocks(aclient):
     """WhatsApp should not contain actions or confirmation blocks."""
-    r = client.post(
-        "/chat",
-        json={
-            "message": "vitals for P001",
-            "user_id": "test-blocks",
-            "channel": "whatsapp",
-            "tenant_id": "test-blocks-wa",
-        },
+    r = await _chat(
+        aclient,
+        "vitals for P001",
+        user_id="test-blocks",
+        channel="whatsapp",
+        tenant_id="test-blocks-wa",
     )
     assert r.status_code == 200
     body = r.json()
@@ -302,17 +261,9 @@ def test_chat_whatsapp_filters_unsupported_blocks(client):
         assert "confirmation" not in types
 
 
-def test_chat_backward_compatibility(client):
+async def test_chat_backward_compatibility(aclient):
     """Old clients that only read 'response' + 'session_id' should still work."""
-    r = client.post(
-        "/chat",
-        json={
-            "message": "vitals for P001",
-            "user_id": "test-compat",
-            "channel": "webchat",
-            "tenant_id": "test",
-        },
-    )
+    r = await _chat(aclient, "vitals for P001", user_id="test-compat")
     assert r.status_code == 200
     body = r.json()
     assert isinstance(body["response"], str)
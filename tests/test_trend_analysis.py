@@ -6,7 +6,7 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "synthetic-monitoring"))
 
 from datetime import datetime, timedelta, timezone
-from app import analyze_trend, compute_news
+from app import analyze_trend, compute_news, compute_news_batch
 
 
 def _make_readings(ews_values: list[int], hours_span: int = 24) -> list[dict]:
@@ -126,3 +126,26 @@ class TestAnalyzeTrendEdgeCases:
         trend = result["trend"]
         for key in ("patient_status", "confidence", "slope", "r_squared", "p_value", "recent_slope", "clinical_interpretation"):
             assert key in trend
+
+
+class TestComputeNews:
+    def test_band_boundaries_are_inclusive(self):
+        normal = {"heart_rate": 75, "spo2": 98, "bp_systolic": 120, "temperature": 37.0}
+        assert compute_news({**normal, "heart_rate": 40}) == 3
+        assert compute_news({**normal, "heart_rate": 41}) == 2
+        assert compute_news({**normal, "heart_rate": 90}) == 0
+        assert compute_news({**normal, "heart_rate": 131}) == 3
+        assert compute_news({**normal, "spo2": 95}) == 1
+        assert compute_news({**normal, "bp_systolic": 219}) == 0
+        assert compute_news({**normal, "bp_systolic": 220}) == 3
+        assert compute_news({**normal, "temperature": 38.0}) == 0
+        assert compute_news({**normal, "temperature": 39.1}) == 2
+
+    def test_batch_matches_scalar(self):
+        readings = [
+            {"heart_rate": 35, "spo2": 90, "bp_systolic": 85, "temperature": 34.5},
+            {"heart_rate": 100, "spo2": 94, "bp_systolic": 105, "temperature": 38.5},
+            {"heart_rate": 75, "spo2": 98, "bp_systolic": 120, "temperature": 37.0},
+            {},
+        ]
+        assert compute_news_batch(readings).tolist() == [compute_news(r) for r in readings]